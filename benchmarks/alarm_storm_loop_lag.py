@@ -0,0 +1,188 @@
+"""Event loop lag during an alarm storm, with and without the decoder worker.
+
+A local TCP server plays the part of the RS485 interface and sends LED mimic
+frames with many LEDs changing on every frame, interleaved with changing LCD
+lines and heartbeats. Every LED callback hands the new state to the event loop
+with call_soon_threadsafe, as the entities do. Meanwhile a ticker on the event
+loop sleeps for a fixed interval and records how late it wakes up.
+
+    python benchmarks/alarm_storm_loop_lag.py --seconds 10 --rate 2000
+
+With the in-process reader the loop competes with decoding for the GIL, with
+--worker only the diffs reach the Home Assistant process.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+from threading import Event, Thread
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "custom_components",
+        "pertronic_f100a",
+    ),
+)
+
+from pertronic.PertronicF100AMimic import PertronicF100AMimic  # noqa: E402
+from pertronic.PertronicFrames import (  # noqa: E402
+    HeartbeatFrame,
+    LcdLineFrame,
+    LedMimicFrame,
+)
+from pertronic.PertronicWorker import PertronicF100AMimicProcess  # noqa: E402
+
+
+def storm_frames(count, seed=1):
+    """Pre-built frames, so the server costs as little as possible"""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        led = bytearray(rng.randbytes(LedMimicFrame.LENGTH))
+        led[0:2] = bytes(LedMimicFrame.HEADER)
+        # Toggle fire and defect along with the addressable LEDs
+        led[2] = 0x80 | 0x40 if i % 2 else 0x00
+        frames.append(bytes(led))
+        if i % 4 == 0:
+            text = "ZONE {:03d} FIRE ALARM {:08d}".format(i % 256, i)
+            frames.append(
+                bytes((LcdLineFrame.HEADER, 0x17 + i % 2))
+                + text.ljust(LcdLineFrame.TEXT_LENGTH).encode("ascii")
+                + bytes(LcdLineFrame.LENGTH - LcdLineFrame.TEXT_LENGTH - 2)
+            )
+        if i % 10 == 0:
+            frames.append(bytes(HeartbeatFrame.HEADER))
+    return frames
+
+
+class StormServer:
+    def __init__(self, rate):
+        self._rate = rate
+        self._frames = storm_frames(1000)
+        self._stop = Event()
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(8)
+        self._sock.settimeout(0.2)
+        self.port = self._sock.getsockname()[1]
+        Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            Thread(target=self._send, args=(conn,), daemon=True).start()
+
+    def _send(self, conn):
+        # Send in 10ms batches to hold the average rate without a sleep per frame
+        per_batch = max(1, self._rate // 100)
+        index = 0
+        next_time = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                batch = []
+                for _ in range(per_batch):
+                    batch.append(self._frames[index])
+                    index = (index + 1) % len(self._frames)
+                conn.sendall(b"".join(batch))
+                next_time += 0.01
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        self._sock.close()
+
+
+async def measure(mimic, seconds, interval):
+    loop = asyncio.get_running_loop()
+    updates = [0]
+
+    def write_state(led_state):
+        updates[0] += 1
+
+    def led_callback(led_state):
+        loop.call_soon_threadsafe(write_state, led_state)
+
+    for led_id in range(1, 257):
+        mimic.register_led_callback(led_id, led_callback)
+    for led_type in ("fire", "defect"):
+        mimic.register_special_led_callback(led_type, led_callback)
+
+    lags = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append((time.monotonic() - start - interval) * 1000)
+    return lags, updates[0]
+
+
+def run(worker, seconds, rate, interval):
+    server = StormServer(rate)
+    mimic_class = PertronicF100AMimicProcess if worker else PertronicF100AMimic
+    mimic = mimic_class("127.0.0.1", server.port)
+    mimic.log.setLevel(logging.CRITICAL)
+    if not mimic.start():
+        server.close()
+        raise SystemExit("Unable to connect to the storm server")
+    # Let the worker start up before measuring
+    time.sleep(1)
+    try:
+        lags, updates = asyncio.run(measure(mimic, seconds, interval))
+        stats = mimic.get_stats()
+    finally:
+        mimic.stop(5)
+        server.close()
+
+    lags.sort()
+    return {
+        "mode": "worker" if worker else "thread",
+        "ticks": len(lags),
+        "lag_ms_p50": round(statistics.median(lags), 2),
+        "lag_ms_p99": round(lags[int(len(lags) * 0.99)], 2),
+        "lag_ms_max": round(lags[-1], 2),
+        "entity_updates_per_s": round(updates / seconds),
+        "bytes_received": stats.get("bytes_received"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=int, default=2000, help="LED frames per second")
+    parser.add_argument(
+        "--interval", type=float, default=0.01, help="ticker sleep in seconds"
+    )
+    parser.add_argument(
+        "--worker",
+        choices=("both", "yes", "no"),
+        default="both",
+        help="decode in a worker process, the in-process reader or both",
+    )
+    args = parser.parse_args()
+
+    modes = {"both": (False, True), "yes": (True,), "no": (False,)}[args.worker]
+    for worker in modes:
+        result = run(worker, args.seconds, args.rate, args.interval)
+        print(" ".join("{}={}".format(key, value) for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
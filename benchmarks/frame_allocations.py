@@ -0,0 +1,231 @@
+"""Memory allocated per LED and LCD frame, original decode against frame views.
+
+    before  the original decoder, every frame sliced off the read as a new
+            bytes object, the remainder sliced again, and every special LED,
+            addressable LED and LCD line written to the state dicts with its
+            callbacks run on every frame
+    after   decode_bytes as it is now, frames are LedMimicFrame / LcdLineFrame
+            views into the receive buffer and only changed fields are decoded
+
+Each frame is fed as its own read. tracemalloc measures the memory allocated
+while decoding it, the peak above what was allocated before, and the blocks
+still held afterwards. A callback is registered for every addressable LED, as
+the binary sensors do.
+
+    python benchmarks/frame_allocations.py --frames 2000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "custom_components",
+        "pertronic_f100a",
+    ),
+)
+
+from pertronic.PertronicF100AMimic import PertronicF100AMimic  # noqa: E402
+from pertronic.PertronicFrames import LcdLineFrame, LedMimicFrame  # noqa: E402
+
+
+class LegacyDecoder:
+    """The original slice and dict decode of LED and LCD frames"""
+
+    def __init__(self):
+        self.log = logging.getLogger("LegacyDecoder")
+        self.log.setLevel(logging.WARNING)
+        self._io_buffer = b""
+        self._bytes_available = 0
+        self._decodes = 0
+        self._led_callbacks = {i: [] for i in range(257)}
+        self.decoded_data = {
+            "led": {
+                "timestamp": 0,
+                "normal": None,
+                "fire": None,
+                "defect": None,
+                "evacuate": None,
+                "silence_alarms": None,
+                "addressable_leds": [None] * 257,
+            },
+            "lcd": {
+                "line_1": {"timestamp": 0, "display_text": None},
+                "line_2": {"timestamp": 0, "display_text": None},
+                "leds": {},
+            },
+        }
+
+    def register_led_callback(self, led, function):
+        self._led_callbacks[led].append(function)
+
+    def decode_bytes(self, data):
+        self._io_buffer = data
+        self._bytes_available = len(data)
+        while self._bytes_available > 0 and len(self._io_buffer) >= 2:
+            if self._io_buffer[0] == 0x19 and self._io_buffer[1] == 0x24:
+                self.process_led_mimic_packet(self._get_io_bytes(38))
+            elif self._io_buffer[0] == 0x20 and self._io_buffer[1] in (0x17, 0x18):
+                self.process_lcd_mimic_line(self._get_io_bytes(46))
+            else:
+                break
+
+    def _get_io_bytes(self, length):
+        self._bytes_available -= length
+        self._decodes += 1
+        output = self._io_buffer[:length]
+        self._io_buffer = self._io_buffer[length:]
+        return output
+
+    def process_led_mimic_packet(self, pkt):
+        led = self.decoded_data["led"]
+        led["timestamp"] = int(time.time())
+        led["silence_alarms"] = bool(pkt[2] & 0x04)
+        led["evacuate"] = bool(pkt[2] & 0x02)
+        led["defect"] = bool(pkt[2] & 0x40)
+        led["fire"] = bool(pkt[2] & 0x80)
+        led["normal"] = bool(not (pkt[2] & 0x40 or pkt[2] & 0x80))
+
+        led_offset = 4
+        for i in range(32):
+            byte = pkt[led_offset + i]
+            for j in range(8):
+                led_id = (i * 8) + j
+                val = bool(byte & (1 << j))
+                led["addressable_leds"][led_id] = val
+                if val:
+                    self.log.debug("LED_{}".format(led_id + 1))
+                for callback in self._led_callbacks[led_id]:
+                    callback(bool(val))
+
+    def process_lcd_mimic_line(self, pkt):
+        line = (pkt[1] == 0x18) + 1
+        line_string = pkt[2:42].decode("utf8").lstrip(" ").rstrip(" ")
+        line_dict = self.decoded_data["lcd"]["line_{}".format(line)]
+        line_dict["display_text"] = line_string
+        line_dict["timestamp"] = int(time.time())
+
+        lcd_led_pkt = pkt[42:]
+        leds_dict = self.decoded_data["lcd"]["leds"]
+        leds_dict["timestamp"] = int(time.time())
+        leds_dict["normal"] = bool(
+            not (lcd_led_pkt[3] & 0x02) and not (lcd_led_pkt[2] & 0x10)
+        )
+        leds_dict["defect"] = bool(lcd_led_pkt[2] & 0x10)
+        leds_dict["fire"] = bool(lcd_led_pkt[3] & 0x02)
+        leds_dict["silence_alarms"] = bool(lcd_led_pkt[3] & 0x10)
+        leds_dict["evacuate"] = bool(lcd_led_pkt[3] & 0x04)
+        leds_dict["device_isolated"] = bool(lcd_led_pkt[2] & 0x01)
+        leds_dict["psu_defect"] = bool(lcd_led_pkt[2] & 0x02)
+        leds_dict["sprinkler"] = None
+        leds_dict["door_holder_isolate"] = bool(lcd_led_pkt[2] & 0x80)
+        leds_dict["aux_isolate"] = bool(lcd_led_pkt[2] & 0x08)
+        leds_dict["walk_test"] = bool(lcd_led_pkt[2] & 0x20)
+
+
+def led_frames(count, changing):
+    """LED frames with a few LEDs lit, one LED toggling per frame if changing"""
+    frames = []
+    for i in range(count):
+        leds = bytearray(LedMimicFrame.LED_BYTES)
+        leds[0] = 0x05
+        if changing:
+            leds[i % len(leds)] ^= 1 << (i % 8)
+        frames.append(bytes(LedMimicFrame.HEADER) + bytes((0x00, 0x00)) + bytes(leds))
+    return frames
+
+
+def lcd_frames(count, changing):
+    """LCD line frames alternating lines, the text changing if changing"""
+    frames = []
+    for i in range(count):
+        text = "ZONE 12 FIRE {:06d}".format(i if changing else 0)
+        frames.append(
+            bytes((LcdLineFrame.HEADER, LcdLineFrame.LINE_1 + i % 2))
+            + text.ljust(LcdLineFrame.TEXT_LENGTH).encode("ascii")
+            + bytes(4)
+        )
+    return frames
+
+
+def new_decoder(legacy):
+    if legacy:
+        decoder = LegacyDecoder()
+    else:
+        decoder = PertronicF100AMimic(None, None)
+        decoder.log.setLevel(logging.CRITICAL)
+
+    def led_callback(state):
+        pass
+
+    for led_id in range(1, 257):
+        decoder.register_led_callback(led_id, led_callback)
+    return decoder
+
+
+def measure(legacy, frames):
+    decoder = new_decoder(legacy)
+    # Warm up, the first frames fill the state and any caches
+    for frame in frames[:10]:
+        decoder.decode_bytes(frame)
+    frames = frames[10:]
+
+    start = time.perf_counter()
+    for frame in frames:
+        decoder.decode_bytes(frame)
+    elapsed = time.perf_counter() - start
+
+    decoder = new_decoder(legacy)
+    for frame in frames[:10]:
+        decoder.decode_bytes(frame)
+    tracemalloc.start()
+    peak_total = 0
+    before = tracemalloc.take_snapshot()
+    for frame in frames:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        decoder.decode_bytes(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - current
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "bytes_allocated": round(peak_total / len(frames)),
+        "blocks_retained": round(retained / len(frames), 2),
+        "us": round(elapsed * 1e6 / len(frames), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = (
+        ("led_unchanged", led_frames(args.frames, False)),
+        ("led_changing", led_frames(args.frames, True)),
+        ("lcd_unchanged", lcd_frames(args.frames, False)),
+        ("lcd_changing", lcd_frames(args.frames, True)),
+    )
+    for name, frames in cases:
+        for label, legacy in (("before", True), ("after", False)):
+            result = measure(legacy, frames)
+            print(
+                "{:14} {:6} bytes_allocated/frame={bytes_allocated} "
+                "blocks_retained/frame={blocks_retained} us/frame={us}".format(
+                    name, label, **result
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
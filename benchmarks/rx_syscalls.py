@@ -0,0 +1,269 @@
+"""I/O calls, allocations and wakeups of the reader on an idle but chatty bus.
+
+A local TCP server stands in for the RS485 interface and trickles quiet panel
+traffic: heartbeats, LCD mimic polls and unchanged LED and LCD frames, each
+frame sent in small pieces the way a serial to Ethernet converter forwards
+them. The same traffic is read two ways:
+
+    before  the original loop, a blocking socket with settimeout(1) and
+            recv(500) on every pass, each read returning a new bytes object
+    after   the reader as it is now, poll() on the socket and a wake pipe
+            then recv_into() a reusable receive buffer until it is drained
+
+Both feed the same decode_bytes, so only the receive path differs. Python
+level calls are counted through proxies and mapped to system calls: on a
+socket with a timeout CPython polls before each recv(), and settimeout()
+sets the blocking mode with an ioctl. Reader CPU time and voluntary context
+switches (wakeups) are taken from the reader thread itself.
+
+    python benchmarks/rx_syscalls.py --seconds 10
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import time
+from threading import Event, Thread
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "custom_components",
+        "pertronic_f100a",
+    ),
+)
+
+from pertronic.PertronicF100AMimic import PertronicF100AMimic  # noqa: E402
+from pertronic.PertronicFrames import (  # noqa: E402
+    HeartbeatFrame,
+    LcdLineFrame,
+    LedMimicFrame,
+)
+from pertronic.PertronicTransport import TcpTransport  # noqa: E402
+
+# (period in ms, frame), a quiet panel with nothing changing
+LCD_TEXT = "SYSTEM NORMAL".ljust(LcdLineFrame.TEXT_LENGTH).encode("ascii")
+CHATTER = (
+    (50, bytes(HeartbeatFrame.HEADER)),
+    (100, bytes((0x80, 0x90)) + bytes(8)),
+    (250, bytes(LedMimicFrame.HEADER) + bytes(LedMimicFrame.LENGTH - 2)),
+    (500, bytes((LcdLineFrame.HEADER, LcdLineFrame.LINE_1)) + LCD_TEXT + bytes(4)),
+    (500, bytes((LcdLineFrame.HEADER, LcdLineFrame.LINE_2)) + LCD_TEXT + bytes(4)),
+)
+
+
+class ChattyServer:
+    def __init__(self, piece_size):
+        self._piece_size = piece_size
+        self._stop = Event()
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(8)
+        self._sock.settimeout(0.2)
+        self.port = self._sock.getsockname()[1]
+        Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            Thread(target=self._send, args=(conn,), daemon=True).start()
+
+    def _send(self, conn):
+        start = time.monotonic()
+        due = [0] * len(CHATTER)
+        try:
+            while not self._stop.is_set():
+                now_ms = (time.monotonic() - start) * 1000
+                for index, (period_ms, frame) in enumerate(CHATTER):
+                    if now_ms < due[index]:
+                        continue
+                    due[index] += period_ms
+                    for pos in range(0, len(frame), self._piece_size):
+                        conn.sendall(frame[pos : pos + self._piece_size])
+                        time.sleep(0.001)
+                time.sleep(0.005)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        self._sock.close()
+
+
+class CallCounter:
+    """Proxy counting calls to the named methods of obj"""
+
+    def __init__(self, obj, counts, names):
+        self._obj = obj
+        self._counts = counts
+        self._names = names
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if name not in self._names:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counts[name] = self._counts.get(name, 0) + 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+def voluntary_context_switches():
+    try:
+        with open("/proc/thread-self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("voluntary_ctxt_switches"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class ThreadUsage:
+    """CPU time and wakeups of the calling thread between start() and stop()"""
+
+    def start(self):
+        self._cpu = time.thread_time()
+        self._switches = voluntary_context_switches()
+
+    def stop(self):
+        self.cpu_s = time.thread_time() - self._cpu
+        switches = voluntary_context_switches()
+        self.wakeups = None if switches is None else switches - self._switches
+
+
+def quiet_mimic():
+    mimic = PertronicF100AMimic("127.0.0.1", 0)
+    mimic.log.setLevel(logging.CRITICAL)
+    return mimic
+
+
+def run_before(port, seconds):
+    """The original receive loop"""
+    mimic = quiet_mimic()
+    counts = {}
+    usage = ThreadUsage()
+    done = Event()
+
+    def reader():
+        io = CallCounter(
+            socket.create_connection(["127.0.0.1", port]),
+            counts,
+            ("settimeout", "recv"),
+        )
+        usage.start()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            io.settimeout(1)
+            data = io.recv(500)
+            counts["bytes"] = counts.get("bytes", 0) + len(data)
+            mimic.decode_bytes(data)
+        usage.stop()
+        io.close()
+        done.set()
+
+    Thread(target=reader, daemon=True).start()
+    done.wait()
+    return {
+        "reads": counts["recv"],
+        "bytes": counts["bytes"],
+        # ioctl for settimeout, poll then recv for each recv
+        "syscalls": counts["settimeout"] + 2 * counts["recv"],
+        # Each recv returns a new bytes object
+        "rx_allocations": counts["recv"],
+        "cpu_s": usage.cpu_s,
+        "wakeups": usage.wakeups,
+    }
+
+
+class CountingTcpTransport(TcpTransport):
+    def __init__(self, host, port, counts):
+        super().__init__(host, port)
+        self._counts = counts
+
+    def open(self):
+        super().open()
+        self._socket = CallCounter(self._socket, self._counts, ("recv_into",))
+        self._poll = CallCounter(self._poll, self._counts, ("poll",))
+
+
+class MeasuredMimic(PertronicF100AMimic):
+    def _read_loop(self, io):
+        self.usage = ThreadUsage()
+        self.usage.start()
+        try:
+            super()._read_loop(io)
+        finally:
+            self.usage.stop()
+
+    def _grow_rx_buffer(self, size):
+        before = len(self._rx_buffer)
+        super()._grow_rx_buffer(size)
+        if len(self._rx_buffer) != before:
+            self.rx_allocations = getattr(self, "rx_allocations", 0) + 1
+
+
+def run_after(port, seconds):
+    """The current reader thread"""
+    counts = {}
+    mimic = MeasuredMimic(
+        "127.0.0.1", port, transport=CountingTcpTransport("127.0.0.1", port, counts)
+    )
+    mimic.log.setLevel(logging.CRITICAL)
+    if not mimic.start():
+        raise SystemExit("Unable to connect to the test server")
+    time.sleep(seconds)
+    mimic.stop(5)
+    stats = mimic.get_stats()
+    return {
+        "reads": stats["reads"],
+        "bytes": stats["bytes_received"],
+        "syscalls": counts.get("poll", 0) + counts.get("recv_into", 0),
+        "rx_allocations": getattr(mimic, "rx_allocations", 0),
+        "cpu_s": mimic.usage.cpu_s,
+        "wakeups": mimic.usage.wakeups,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument(
+        "--piece-size", type=int, default=8, help="bytes per TCP segment sent"
+    )
+    args = parser.parse_args()
+
+    for name, run in (("before", run_before), ("after", run_after)):
+        server = ChattyServer(args.piece_size)
+        try:
+            result = run(server.port, args.seconds)
+        finally:
+            server.close()
+        per_second = {
+            key: None if value is None else round(value / args.seconds, 1)
+            for key, value in result.items()
+            if key != "cpu_s"
+        }
+        print(
+            "{:6} reads/s={reads} bytes/s={bytes} syscalls/s={syscalls} "
+            "rx_allocations/s={rx_allocations} wakeups/s={wakeups} "
+            "reader_cpu_ms/s={cpu}".format(
+                name, cpu=round(result["cpu_s"] * 1000 / args.seconds, 2), **per_second
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
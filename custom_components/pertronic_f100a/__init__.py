@@ -1,16 +1,28 @@
 """The Pertronic F100A RS485 integration."""
 from __future__ import annotations
 
+from datetime import timedelta
 import logging
 import time
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
 
 from .const import (
+    ACTIVE_MODE,
     CONF_API_REF,
+    CONF_EXPORTER_REF,
+    DEFAULT_BAUDRATE,
+    DEFAULT_LIVENESS_TIMEOUT,
+    DEFAULT_TURNAROUND_MS,
     DOMAIN,
+    EVENT_ALARM,
+    EXPORT_URLS,
+    LIVENESS_CHECK_INTERVAL,
+    LIVENESS_TIMEOUT,
+    MIMIC_RESPONSE,
     MIMIC_0_99_LEDS_NUM,
     MIMIC_100_199_LEDS_NUM,
     MIMIC_200_256_LEDS_NUM,
@@ -18,8 +30,18 @@ from .const import (
     PANEL_NAME_SHORT,
     RS485_INTERFACE_IP,
     RS485_INTERFACE_TCP_PORT,
+    SERIAL_BAUDRATE,
+    SERIAL_PORT,
+    STOP_TIMEOUT,
+    TURNAROUND_MS,
+    VERIFY_FRAMES,
+    WORKER_PROCESS,
 )
+from .pertronic.PertronicExport import PertronicStateExporter, create_sink
 from .pertronic.PertronicF100AMimic import PertronicF100AMimic
+from .pertronic.PertronicFrames import mimic_response_from_hex
+from .pertronic.PertronicTransport import SerialTransport
+from .pertronic.PertronicWorker import PertronicF100AMimicProcess
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +49,7 @@ _LOGGER = logging.getLogger(__name__)
 # For your initial PR, limit it to 1 platform.
 PLATFORMS: list[Platform] = [
     Platform.BINARY_SENSOR,
+    Platform.SENSOR,
     Platform.TEXT,
 ]
 
@@ -49,26 +72,115 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Start the interface demon
     pertronic = hass.data[DOMAIN][entry.entry_id][CONF_API_REF]
+
+    def fire_alarm_event(led_type, state, decode_latency_ms):
+        """Priority lane callback, runs in the reader thread"""
+        hass.bus.fire(
+            EVENT_ALARM,
+            {
+                "entry_id": entry.entry_id,
+                "led": led_type,
+                "state": state,
+                "decode_latency_ms": decode_latency_ms,
+            },
+        )
+
+    pertronic.register_alarm_callback(fire_alarm_event)
+    entry.async_on_unload(lambda: pertronic.unregister_callback(fire_alarm_event))
+
+    exporter = storage.get(CONF_EXPORTER_REF)
+    if exporter is not None:
+        exporter.start()
     await hass.async_add_executor_job(pertronic.start)
     await hass.async_add_executor_job(time.sleep, 1)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # A single timer drives the liveness monitor for every entity on this panel,
+    # it runs in the event loop as it writes entity state
+    @callback
+    def check_liveness(now):
+        pertronic.check_liveness()
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass, check_liveness, timedelta(seconds=LIVENESS_CHECK_INTERVAL)
+        )
+    )
+
+    # Entries are not unloaded when Home Assistant stops, release the
+    # connection here as well
+    async def stop_on_shutdown(event: Event) -> None:
+        await hass.async_add_executor_job(stop_api, storage)
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop_on_shutdown)
+    )
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    _LOGGER.info("Unloading pertronic_f100a_rs485 entry {entry.entry_id}".format)
+    _LOGGER.info("Unloading pertronic_f100a_rs485 entry {}".format(entry.entry_id))
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        storage = hass.data[DOMAIN].pop(entry.entry_id)
+        await hass.async_add_executor_job(stop_api, storage)
 
     return unload_ok
 
 
+def stop_api(storage):
+    """Stop the reader then flush the exporter, safe to call more than once"""
+    pertronic = storage.get(CONF_API_REF)
+    if pertronic is not None and not pertronic.stop(STOP_TIMEOUT):
+        _LOGGER.warning(
+            "Pertronic reader did not stop within {}s".format(STOP_TIMEOUT)
+        )
+
+    exporter = storage.get(CONF_EXPORTER_REF)
+    if exporter is not None:
+        exporter.stop(STOP_TIMEOUT)
+
+
 def load_api(storage, entry: ConfigEntry):
     """A Doc String"""
     # We have to seperate this to a seperate function as the __init__ function is not async
-    storage[CONF_API_REF] = PertronicF100AMimic(
-        entry.data.get(RS485_INTERFACE_IP), entry.data.get(RS485_INTERFACE_TCP_PORT)
+    if entry.data.get(WORKER_PROCESS, False):
+        mimic_class = PertronicF100AMimicProcess
+    else:
+        mimic_class = PertronicF100AMimic
+
+    mimic_response = None
+    if entry.data.get(MIMIC_RESPONSE):
+        mimic_response = mimic_response_from_hex(entry.data[MIMIC_RESPONSE])
+
+    transport = None
+    if entry.data.get(SERIAL_PORT):
+        transport = SerialTransport(
+            entry.data.get(SERIAL_PORT),
+            entry.data.get(SERIAL_BAUDRATE, DEFAULT_BAUDRATE),
+        )
+
+    storage[CONF_API_REF] = mimic_class(
+        entry.data.get(RS485_INTERFACE_IP),
+        entry.data.get(RS485_INTERFACE_TCP_PORT),
+        entry.data.get(LIVENESS_TIMEOUT, DEFAULT_LIVENESS_TIMEOUT),
+        entry.data.get(ACTIVE_MODE, False),
+        entry.data.get(TURNAROUND_MS, DEFAULT_TURNAROUND_MS),
+        transport,
+        entry.data.get(VERIFY_FRAMES, True),
+        mimic_response,
     )
+
+    export_urls = [
+        url.strip()
+        for url in entry.data.get(EXPORT_URLS, "").split(",")
+        if url.strip()
+    ]
+    if export_urls:
+        storage[CONF_EXPORTER_REF] = PertronicStateExporter(
+            storage[CONF_API_REF],
+            [create_sink(url) for url in export_urls],
+            entry.data.get(PANEL_NAME_SHORT),
+        )
@@ -118,12 +118,27 @@ class PetronicBinarySensor(BinarySensorEntity):
         )
 
         pertronic.register_led_callback(led_id, self.proccess_callback)
+        pertronic.register_availability_callback(self.availability_callback)
 
     @property
     def is_on(self):
         """Return true if the binary sensor is on."""
         return self._is_on
 
+    @property
+    def available(self):
+        """Unavailable while the panel has gone quiet"""
+        return self._pertronic.available
+
+    @property
+    def extra_state_attributes(self):
+        """Updates of a flapping LED are rate limited"""
+        return {"flapping": self._pertronic.activity.is_flapping(self._led_id)}
+
+    def availability_callback(self, available):
+        """Availability change from the liveness monitor"""
+        self.async_write_ha_state()
+
     def proccess_callback(self, led_state):
         """Callback processor"""
         self._is_on = led_state
@@ -137,6 +152,11 @@ class PetronicBinarySensor(BinarySensorEntity):
         """Handle entity which will be added."""
         self.proccess_callback(self._pertronic.get_led_state(self._led_id))
 
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop receiving updates once removed, e.g. when the entry unloads"""
+        self._pertronic.unregister_callback(self.proccess_callback)
+        self._pertronic.unregister_callback(self.availability_callback)
+
     async def async_get_last_state(self):
         """Returns item state"""
         return self._is_on
@@ -159,12 +179,22 @@ class PetronicSpecialBinarySensor(BinarySensorEntity):
         )
 
         pertronic.register_special_led_callback(led_type, self.proccess_callback)
+        pertronic.register_availability_callback(self.availability_callback)
 
     @property
     def is_on(self):
         """Return true if the binary sensor is on."""
         return self._is_on
 
+    @property
+    def available(self):
+        """Unavailable while the panel has gone quiet"""
+        return self._pertronic.available
+
+    def availability_callback(self, available):
+        """Availability change from the liveness monitor"""
+        self.async_write_ha_state()
+
     def proccess_callback(self, led_state):
         """Callback processor"""
         self._is_on = led_state
@@ -178,6 +208,11 @@ class PetronicSpecialBinarySensor(BinarySensorEntity):
         """Handle entity which will be added."""
         self.proccess_callback(self._pertronic.get_special_led_state(self._led_id))
 
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop receiving updates once removed, e.g. when the entry unloads"""
+        self._pertronic.unregister_callback(self.proccess_callback)
+        self._pertronic.unregister_callback(self.availability_callback)
+
     async def async_get_last_state(self):
         """Returns item state"""
         return self._is_on
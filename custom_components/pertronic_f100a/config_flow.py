@@ -3,10 +3,14 @@ from __future__ import annotations
 
 import logging
 from typing import Any
+from urllib.parse import urlparse
 
 import voluptuous as vol
 
+from .pertronic.PertronicExport import create_sink
 from .pertronic.PertronicF100AMimic import PertronicF100AMimic
+from .pertronic.PertronicFrames import mimic_response_from_hex
+from .pertronic.PertronicTransport import SerialTransport, list_serial_ports
 
 from homeassistant import config_entries
 from homeassistant.core import HomeAssistant
@@ -14,7 +18,13 @@ from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN
+from .const import (
+    DEFAULT_BAUDRATE,
+    DEFAULT_LIVENESS_TIMEOUT,
+    DEFAULT_TURNAROUND_MS,
+    DOMAIN,
+    EXPORT_URL_SCHEMES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,8 +36,24 @@ def create_host_data_schema(
     led_0_99=99,
     led_100_199=99,
     led_200_256=56,
+    stale_timeout=DEFAULT_LIVENESS_TIMEOUT,
+    worker_process=False,
+    active_mode=False,
+    turnaround_ms=DEFAULT_TURNAROUND_MS,
+    serial_port="",
+    baudrate=DEFAULT_BAUDRATE,
+    serial_ports=None,
+    export_urls="",
+    verify_frames=True,
+    mimic_response="",
 ):
     """Returns the schema for the UI configuration interface"""
+    # An empty serial port means the TCP interface is used
+    port_options = {"": "TCP (RS485 to Ethernet interface)"}
+    port_options.update(serial_ports or {})
+    if serial_port not in port_options:
+        port_options[serial_port] = serial_port
+
     return vol.Schema(
         {
             vol.Required("panel_name", description={"suggested_value": panel_name}): str,
@@ -37,6 +63,15 @@ def create_host_data_schema(
             vol.Required("led_0_99", default=led_0_99): int,
             vol.Required("led_100_199", default=led_100_199): int,
             vol.Required("led_200_256", default=led_200_256): int,
+            vol.Required("stale_timeout", default=stale_timeout): int,
+            vol.Required("worker_process", default=worker_process): bool,
+            vol.Required("active_mode", default=active_mode): bool,
+            vol.Required("turnaround_ms", default=turnaround_ms): int,
+            vol.Optional("mimic_response", default=mimic_response): str,
+            vol.Optional("serial_port", default=serial_port): vol.In(port_options),
+            vol.Required("baudrate", default=baudrate): int,
+            vol.Optional("export_urls", default=export_urls): str,
+            vol.Required("verify_frames", default=verify_frames): bool,
         }
     )
 
@@ -51,8 +86,40 @@ def validate_input_with_pertronic(data: dict[str, Any]) -> bool:
     if data["led_200_256"] < 0 or data["led_200_256"] > 56:
         raise InvalidLedLength
 
+    if data["stale_timeout"] < 1:
+        raise InvalidStaleTimeout
+
+    if data["turnaround_ms"] < 0:
+        raise InvalidTurnaround
+
+    # Active mode only transmits a response it has been given, without one
+    # the switch would do nothing
+    if data["active_mode"] or data.get("mimic_response"):
+        try:
+            mimic_response_from_hex(data.get("mimic_response", ""))
+        except ValueError as e:
+            raise InvalidMimicResponse from e
+
+    for url in data.get("export_urls", "").split(","):
+        url = url.strip()
+        if not url:
+            continue
+        if urlparse(url).scheme not in EXPORT_URL_SCHEMES:
+            raise InvalidExportUrl
+        # Catches a missing host or port, or paho-mqtt not being installed
+        try:
+            sink = create_sink(url)
+        except (ImportError, ValueError) as e:
+            _LOGGER.warning("Invalid export URL {} - {}".format(url, e))
+            raise InvalidExportUrl from e
+        sink.close()
+
 
-    mimic = PertronicF100AMimic(data["ip_addr"], data["port"])
+    transport = None
+    if data.get("serial_port"):
+        transport = SerialTransport(data["serial_port"], data["baudrate"])
+
+    mimic = PertronicF100AMimic(data["ip_addr"], data["port"], transport=transport)
 
     if mimic.test_connection() is not True:
         raise CannotConnect
@@ -74,6 +141,15 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
         "led_0_99": data["led_0_99"],
         "led_100_199": data["led_100_199"],
         "led_200_256": data["led_200_256"],
+        "stale_timeout": data["stale_timeout"],
+        "worker_process": data["worker_process"],
+        "active_mode": data["active_mode"],
+        "turnaround_ms": data["turnaround_ms"],
+        "serial_port": data.get("serial_port", ""),
+        "baudrate": data["baudrate"],
+        "export_urls": data.get("export_urls", ""),
+        "verify_frames": data["verify_frames"],
+        "mimic_response": data.get("mimic_response", ""),
     }
 
 
@@ -86,9 +162,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
+        serial_ports = await self.hass.async_add_executor_job(list_serial_ports)
+
         if user_input is None:
             return self.async_show_form(
-                step_id="user", data_schema=create_host_data_schema()
+                step_id="user",
+                data_schema=create_host_data_schema(serial_ports=serial_ports),
             )
 
         errors = {}
@@ -101,6 +180,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors["base"] = "invalid_auth"
         except InvalidLedLength:
             errors["base"] = "invalid_led_length"
+        except InvalidStaleTimeout:
+            errors["base"] = "invalid_stale_timeout"
+        except InvalidTurnaround:
+            errors["base"] = "invalid_turnaround"
+        except InvalidMimicResponse:
+            errors["base"] = "invalid_mimic_response"
+        except InvalidExportUrl:
+            errors["base"] = "invalid_export_url"
 
         except Exception:  # pylint: disable=broad-except
             _LOGGER.exception("Unexpected exception")
@@ -110,7 +197,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="user", data_schema=create_host_data_schema(
-                user_input["panel_name"], user_input["panel_name_short"], user_input["ip_addr"], user_input["port"], user_input["led_0_99"], user_input["led_100_199"], user_input["led_200_256"]
+                user_input["panel_name"], user_input["panel_name_short"], user_input["ip_addr"], user_input["port"], user_input["led_0_99"], user_input["led_100_199"], user_input["led_200_256"], user_input["stale_timeout"], user_input["worker_process"], user_input["active_mode"], user_input["turnaround_ms"], user_input.get("serial_port", ""), user_input["baudrate"], serial_ports, user_input.get("export_urls", ""), user_input["verify_frames"], user_input.get("mimic_response", "")
             ), errors=errors
         )
 
@@ -124,3 +211,15 @@ class InvalidAuth(HomeAssistantError):
 
 class InvalidLedLength(HomeAssistantError):
     """Error to indicate there is invalid auth."""
+
+class InvalidStaleTimeout(HomeAssistantError):
+    """Error to indicate the liveness timeout is out of range."""
+
+class InvalidTurnaround(HomeAssistantError):
+    """Error to indicate the RS485 turnaround time is out of range."""
+
+class InvalidExportUrl(HomeAssistantError):
+    """Error to indicate an export sink URL is not supported."""
+
+class InvalidMimicResponse(HomeAssistantError):
+    """Error to indicate active mode has no valid mimic response frame."""
@@ -5,6 +5,7 @@ DOMAIN = "pertronic_f100a_rs485"
 
 # Location in memory of API
 CONF_API_REF = "Pertronic_F100A"
+CONF_EXPORTER_REF = "Pertronic_F100A_Exporter"
 
 # Display Names
 PANEL_NAME_LONG = "panel_name"
@@ -18,3 +19,42 @@ RS485_INTERFACE_TCP_PORT = "port"
 MIMIC_0_99_LEDS_NUM = "led_0_99"
 MIMIC_100_199_LEDS_NUM = "led_100_199"
 MIMIC_200_256_LEDS_NUM = "led_200_256"
+
+# Fired on the HA bus from the priority lane when an alarm LED changes state
+EVENT_ALARM = "pertronic_f100a_rs485_alarm"
+
+# Seconds without any frame from the panel before entities are unavailable
+LIVENESS_TIMEOUT = "stale_timeout"
+DEFAULT_LIVENESS_TIMEOUT = 30
+
+# How often the liveness monitor runs, in seconds
+LIVENESS_CHECK_INTERVAL = 1
+
+# Seconds to wait for the reader and exporter to stop when unloading
+STOP_TIMEOUT = 5
+
+# Decode in a separate process instead of a thread inside Home Assistant
+WORKER_PROCESS = "worker_process"
+
+# Answer LCD mimic polls as a mimic when no physical mimic is on the bus
+ACTIVE_MODE = "active_mode"
+
+# Time to wait after the panel has released the bus before replying, in ms
+TURNAROUND_MS = "turnaround_ms"
+DEFAULT_TURNAROUND_MS = 5
+
+# Hex frame answering LCD mimic polls in active mode, e.g. captured from the
+# physical mimic before it was removed. Active mode needs one.
+MIMIC_RESPONSE = "mimic_response"
+
+# Reject LED / LCD frames that fail their learnt check bytes
+VERIFY_FRAMES = "verify_frames"
+
+# Local RS485 adapter, used instead of the TCP interface when a port is set
+SERIAL_PORT = "serial_port"
+SERIAL_BAUDRATE = "baudrate"
+DEFAULT_BAUDRATE = 9600
+
+# Comma separated sink URLs that decoded state changes are published to
+EXPORT_URLS = "export_urls"
+EXPORT_URL_SCHEMES = ("file", "udp", "http", "https", "mqtt")
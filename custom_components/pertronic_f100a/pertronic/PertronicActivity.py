@@ -0,0 +1,165 @@
+"""Per LED activity statistics and flap detection.
+
+A faulty detector or loop can toggle an LED many times a minute, flooding
+entity updates and recorder rows while looking just like a real alarm. Every
+addressable LED transition is counted here in a sliding window made of fixed
+size time buckets, so memory does not grow with the amount of traffic:
+
+    transitions[led * buckets + bucket]     transitions in the bucket
+    on_ms[led * buckets + bucket]           on time that ended in the bucket
+
+A bucket slot is only reset when it is reused for a newer bucket, there is no
+periodic sweep over all LEDs.
+
+An LED with flap_transitions or more transitions inside the window is flagged
+as flapping. While flapping its entity updates are limited to one per
+flap_update_ms, the latest state is published by flush() once the interval has
+passed. The flag clears when the LED drops below half the threshold.
+"""
+
+from array import array
+from threading import Lock
+
+
+class PertronicLedActivity:
+    def __init__(
+        self,
+        led_count: int = 257,
+        bucket_ms: int = 10000,
+        buckets: int = 60,
+        flap_transitions: int = 20,
+        flap_update_ms: int = 60000,
+    ):
+        self._led_count = led_count
+        self._bucket_ms = bucket_ms
+        self._buckets = buckets
+        self._flap_transitions = flap_transitions
+        self._flap_update_ms = flap_update_ms
+        self.window_ms = bucket_ms * buckets
+
+        size = led_count * buckets
+        self._bucket_ids = array("q", [-1]) * size
+        self._transitions = array("L", [0]) * size
+        self._on_ms = array("q", [0]) * size
+
+        self._on_since = array("q", [-1]) * led_count
+        self._last_update_ms = array("q", [-1]) * led_count
+        self._flapping = array("b", [0]) * led_count
+        self._pending = array("b", [0]) * led_count
+        self._states = [None] * led_count
+
+        self._lock = Lock()
+
+        self.stats = {
+            "led_transitions": 0,
+            "led_updates_suppressed": 0,
+            "led_flap_events": 0,
+        }
+
+    def _slot(self, led_id, now_ms):
+        """Index of the current bucket for led_id, reset if it held an old bucket"""
+        bucket_id = now_ms // self._bucket_ms
+        index = led_id * self._buckets + bucket_id % self._buckets
+        if self._bucket_ids[index] != bucket_id:
+            self._bucket_ids[index] = bucket_id
+            self._transitions[index] = 0
+            self._on_ms[index] = 0
+        return index
+
+    def _window_sum(self, values, led_id, now_ms):
+        oldest = now_ms // self._bucket_ms - self._buckets
+        base = led_id * self._buckets
+        total = 0
+        for index in range(base, base + self._buckets):
+            if self._bucket_ids[index] > oldest:
+                total += values[index]
+        return total
+
+    def record(self, led_id: int, state: bool, now_ms: int, transition=True):
+        """Account for an LED transition, or the initial state when transition
+        is False.
+
+        Returns True if the entity should be updated now, False if the update
+        is held back because the LED is flapping.
+        """
+        with self._lock:
+            self._states[led_id] = state
+            index = self._slot(led_id, now_ms)
+            if transition:
+                self.stats["led_transitions"] += 1
+                self._transitions[index] += 1
+            if state:
+                if self._on_since[led_id] < 0:
+                    self._on_since[led_id] = now_ms
+            elif self._on_since[led_id] >= 0:
+                self._on_ms[index] += now_ms - self._on_since[led_id]
+                self._on_since[led_id] = -1
+
+            if not self._flapping[led_id]:
+                transitions = self._window_sum(self._transitions, led_id, now_ms)
+                if transitions >= self._flap_transitions:
+                    self._flapping[led_id] = 1
+                    self.stats["led_flap_events"] += 1
+
+            if (
+                self._flapping[led_id]
+                and self._last_update_ms[led_id] >= 0
+                and now_ms - self._last_update_ms[led_id] < self._flap_update_ms
+            ):
+                self._pending[led_id] = 1
+                self.stats["led_updates_suppressed"] += 1
+                return False
+
+            self._pending[led_id] = 0
+            self._last_update_ms[led_id] = now_ms
+            return True
+
+    def flush(self, now_ms: int):
+        """Clear flags on LEDs that have settled and return [(led_id, state)]
+        for held back updates that are now due, intended to be run from a
+        single timer"""
+        due = []
+        with self._lock:
+            for led_id in range(self._led_count):
+                if not self._flapping[led_id]:
+                    continue
+
+                transitions = self._window_sum(self._transitions, led_id, now_ms)
+                if transitions < self._flap_transitions // 2:
+                    self._flapping[led_id] = 0
+
+                if self._pending[led_id] and (
+                    not self._flapping[led_id]
+                    or now_ms - self._last_update_ms[led_id] >= self._flap_update_ms
+                ):
+                    self._pending[led_id] = 0
+                    self._last_update_ms[led_id] = now_ms
+                    due.append((led_id, self._states[led_id]))
+        return due
+
+    def is_flapping(self, led_id: int):
+        return bool(self._flapping[led_id])
+
+    def get_flapping(self):
+        return [led_id for led_id in range(self._led_count) if self._flapping[led_id]]
+
+    def get_transitions(self, led_id: int, now_ms: int):
+        """Transitions of led_id within the window"""
+        with self._lock:
+            return self._window_sum(self._transitions, led_id, now_ms)
+
+    def get_on_time_ms(self, led_id: int, now_ms: int):
+        """Time led_id has been on within the window"""
+        with self._lock:
+            on_ms = self._window_sum(self._on_ms, led_id, now_ms)
+            if self._on_since[led_id] >= 0:
+                on_ms += now_ms - self._on_since[led_id]
+        return min(on_ms, self.window_ms)
+
+    def get_total_transitions(self, now_ms: int):
+        """Transitions of all LEDs within the window"""
+        with self._lock:
+            return sum(
+                self._window_sum(self._transitions, led_id, now_ms)
+                for led_id in range(self._led_count)
+            )
@@ -0,0 +1,317 @@
+"""Publish decoded panel state changes to external systems.
+
+The exporter hooks the PertronicF100AMimic callbacks and turns every change
+into a compact JSON diff:
+
+    {"t": 1700000000000, "type": "led", "id": 12, "state": true}
+    {"t": 1700000000000, "type": "special", "id": "fire", "state": true}
+    {"t": 1700000000000, "type": "lcd", "id": 1, "text": "FIRE ZONE 1"}
+
+Diffs are queued and sent in batches from a separate thread, so a slow sink
+never holds up decoding. When the queue is full new diffs are dropped and
+counted instead of blocking the reader.
+
+Sinks are created from URLs:
+
+    file:///var/log/f100a.jsonl     append JSON lines to a file
+    udp://10.0.0.5:5140             one datagram per batch
+    http://bms.local/hook           POST each batch (https also supported)
+    mqtt://broker:1883/f100a/state  publish each batch, needs paho-mqtt
+"""
+
+import json
+import logging
+import queue
+import socket
+from threading import Thread
+import time
+from urllib.parse import urlparse
+import urllib.request
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:  # Only needed for mqtt:// sinks
+    mqtt = None
+
+
+def current_milli_time():
+    return round(time.time() * 1000)
+
+
+class FileSink:
+    def __init__(self, path: str):
+        self._path = path
+
+    def __str__(self):
+        return "file://{}".format(self._path)
+
+    def send(self, payload: dict):
+        with open(self._path, "a", encoding="utf8") as f:
+            for diff in payload["diffs"]:
+                f.write(json.dumps(dict(diff, panel=payload["panel"])))
+                f.write("\n")
+
+    def close(self):
+        pass
+
+
+class StreamSink:
+    """JSON lines to an open text stream such as stdout"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __str__(self):
+        return getattr(self._stream, "name", "stream")
+
+    def send(self, payload: dict):
+        for diff in payload["diffs"]:
+            self._stream.write(json.dumps(dict(diff, panel=payload["panel"])))
+            self._stream.write("\n")
+        self._stream.flush()
+
+    def close(self):
+        pass
+
+
+class UdpSink:
+    def __init__(self, host: str, port: int):
+        self._address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __str__(self):
+        return "udp://{0}:{1}".format(*self._address)
+
+    def send(self, payload: dict):
+        self._socket.sendto(json.dumps(payload).encode("utf8"), self._address)
+
+    def close(self):
+        self._socket.close()
+
+
+class WebhookSink:
+    def __init__(self, url: str, timeout: int = 5):
+        self._url = url
+        self._timeout = timeout
+
+    def __str__(self):
+        return self._url
+
+    def send(self, payload: dict):
+        request = urllib.request.Request(
+            self._url,
+            data=json.dumps(payload).encode("utf8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self._timeout) as response:
+            response.read()
+
+    def close(self):
+        pass
+
+
+class MqttSink:
+    def __init__(self, host: str, port: int, topic: str):
+        if mqtt is None:
+            raise ImportError("paho-mqtt is required for mqtt:// sinks")
+        self._host = host
+        self._port = port
+        self._topic = topic
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            # paho-mqtt 2 warns about the version 1 callback API otherwise
+            self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        else:
+            self._client = mqtt.Client()
+        self._client.connect_async(host, port)
+        self._client.loop_start()
+
+    def __str__(self):
+        return "mqtt://{0}:{1}/{2}".format(self._host, self._port, self._topic)
+
+    def send(self, payload: dict):
+        self._client.publish(self._topic, json.dumps(payload), qos=1)
+
+    def close(self):
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+def create_sink(url: str):
+    """Returns a sink for url, raises ValueError for unsupported schemes or
+    incomplete URLs and ImportError when the client library is missing"""
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        if not parsed.path:
+            raise ValueError("No path in export sink {}".format(url))
+        return FileSink(parsed.path)
+    if parsed.scheme in ("udp", "mqtt") and not parsed.hostname:
+        raise ValueError("No host in export sink {}".format(url))
+    if parsed.scheme == "udp":
+        if parsed.port is None:
+            raise ValueError("No port in export sink {}".format(url))
+        return UdpSink(parsed.hostname, parsed.port)
+    if parsed.scheme in ("http", "https"):
+        return WebhookSink(url)
+    if parsed.scheme == "mqtt":
+        return MqttSink(parsed.hostname, parsed.port or 1883, parsed.path.lstrip("/"))
+    raise ValueError("Unsupported export sink {}".format(url))
+
+
+class PertronicStateExporter:
+    def __init__(
+        self,
+        pertronic,
+        sinks,
+        panel_name: str = "F100A",
+        batch_size: int = 100,
+        batch_interval: float = 0.5,
+        max_queue: int = 5000,
+    ):
+        self.log = logging.getLogger(self.__class__.__name__)
+
+        self._pertronic = pertronic
+        self._sinks = list(sinks)
+        self._panel_name = panel_name
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        self._run = False
+        self._thread = None
+
+        self.stats = {
+            "diffs_queued": 0,
+            "diffs_sent": 0,
+            "diffs_dropped": 0,
+            "batches_sent": 0,
+            "send_errors": 0,
+        }
+
+        # Last exported text of each LCD line, the callback gets both lines
+        self._lcd_text = {1: None, 2: None}
+
+        self._callbacks = [self._led_changed, self._lcd_changed]
+        pertronic.register_led_change_callback(self._led_changed)
+        pertronic.register_lcd_callback(self._lcd_changed)
+        for led_type in pertronic.get_special_led_names():
+            callback = self._special_callback(led_type)
+            self._callbacks.append(callback)
+            pertronic.register_special_led_callback(led_type, callback)
+
+    def start(self):
+        self._run = True
+        self._thread = Thread(
+            target=self._send_loop, args=(), name="pertronic_export", daemon=True
+        )
+        self._thread.start()
+        self.log.info(
+            "Exporting to {}".format(", ".join(str(sink) for sink in self._sinks))
+        )
+
+    def stop(self, timeout=None):
+        """Stop exporting, waits up to timeout seconds for queued diffs to be
+        sent"""
+        for callback in self._callbacks:
+            self._pertronic.unregister_callback(callback)
+        self._run = False
+        try:
+            # Wakes the send loop if it is waiting on an empty queue
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self.log.warning(
+                    "Export queue not drained within {}s, {} diffs left".format(
+                        timeout, self._queue.qsize()
+                    )
+                )
+                # The send loop exits once the current batch is done
+                with self._queue.mutex:
+                    self._queue.queue.clear()
+            self._thread = None
+        for sink in self._sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                self.log.error("Unable to close sink {} - {}".format(sink, e))
+
+    def _enqueue(self, diff):
+        try:
+            self._queue.put_nowait(diff)
+            self.stats["diffs_queued"] += 1
+        except queue.Full:
+            # Never block the reader, drop and account for it instead
+            self.stats["diffs_dropped"] += 1
+
+    def _led_changed(self, led_id, state):
+        self._enqueue(
+            {"t": current_milli_time(), "type": "led", "id": led_id, "state": state}
+        )
+
+    def _lcd_changed(self, text_1, text_2):
+        now = current_milli_time()
+        for line, text in ((1, text_1), (2, text_2)):
+            if text != self._lcd_text[line]:
+                self._lcd_text[line] = text
+                self._enqueue({"t": now, "type": "lcd", "id": line, "text": text})
+
+    def _special_callback(self, led_type):
+        def special_changed(state):
+            self._enqueue(
+                {
+                    "t": current_milli_time(),
+                    "type": "special",
+                    "id": led_type,
+                    "state": state,
+                }
+            )
+
+        return special_changed
+
+    def _next_batch(self):
+        """Wait for the first diff then collect until the batch is full or the
+        batch interval has passed"""
+        try:
+            diff = self._queue.get(timeout=1)
+        except queue.Empty:
+            return []
+        if diff is None:
+            return []
+        batch = [diff]
+
+        deadline = time.monotonic() + self._batch_interval
+        while len(batch) < self._batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    diff = self._queue.get(timeout=timeout)
+                else:
+                    # Past the interval, take whatever backlog is already queued
+                    diff = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if diff is None:
+                break
+            batch.append(diff)
+        return batch
+
+    def _send_loop(self):
+        # Keep going after stop() until whatever is already queued is sent
+        while self._run or not self._queue.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            payload = {"panel": self._panel_name, "diffs": batch}
+            for sink in self._sinks:
+                try:
+                    sink.send(payload)
+                except Exception as e:
+                    self.stats["send_errors"] += 1
+                    self.log.error("Unable to export to {} - {}".format(sink, e))
+
+            self.stats["batches_sent"] += 1
+            self.stats["diffs_sent"] += len(batch)
@@ -1,12 +1,22 @@
-import serial
-from serial.tools import list_ports
+import asyncio
 import logging
 from .CustomFormatter import CustomFormatter
+from .PertronicActivity import PertronicLedActivity
+from .PertronicChecksum import PertronicFrameCheck
+from .PertronicFrames import HeartbeatFrame, LcdLineFrame, LedMimicFrame
+from .PertronicSubscribe import (
+    HeartbeatDiff,
+    LcdDiff,
+    LedDiff,
+    PertronicSubscription,
+    SpecialLedDiff,
+)
+from .PertronicTransport import TcpTransport
+from .PertronicTxScheduler import PertronicTxScheduler
 from datetime import datetime
 import time
-import socket
 import traceback
-from threading import Thread
+from threading import Event, Thread
 
 
 def _byte_hex_str(bytes_array):
@@ -17,18 +27,84 @@ def current_milli_time():
     return round(time.time() * 1000)
 
 
+def current_monotonic_milli_time():
+    return time.monotonic_ns() // 1000000
+
+
 class PertronicF100AMimic:
-    def __init__(self, host: str, port: int):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        liveness_timeout: int = 30,
+        active_mode: bool = False,
+        turnaround_ms: int = 5,
+        transport=None,
+        verify_frames: bool = True,
+        mimic_response: bytes = None,
+    ):
+        """
+        verify_frames:  reject frames that fail their learnt check bytes, when
+                        False the checks are still learnt and reported
+        mimic_response: frame sent in answer to LCD mimic polls in active mode
+                        until one from a physical mimic has been seen
+        """
         self._host_ip: str = host
         self._host_port: int = port
         self._timeout = 500
 
+        if transport is None:
+            transport = TcpTransport(host, port)
+        self._transport = transport
+        self._reconnect_delay = 10
+        # Seconds of silence before the connection is treated as lost
+        self._silence_timeout = 10
+        self._stop_event = Event()
+
         self._setup_logging()
 
+        # Previous raw state, used to skip decoding of unchanged fields
+        self._led_bitmap = None
+        self._lcd_text_raw = {1: None, 2: None}
+        # (frame header, offset) -> previous special LED byte
+        self._special_led_bytes = {}
+
         # Used inside IO loop
-        self._bytes_available = 0
-        self._decodes = 0
-        self._io_buffer = []
+        self._rx_time_ms = None
+
+        # Preallocated receive buffer, read into directly and grown when a
+        # single read fills it
+        self._rx_buffer = bytearray(512)
+        self._rx_view = memoryview(self._rx_buffer)
+        self._rx_buffer_max = 65536
+        self._rx_fill = 0
+
+        # Frame header -> (length, required third byte, handler)
+        # A handler of None means the frame is known but not decoded
+        self._frame_decoders = {
+            # LED Mimic Status update
+            (0x19, 0x24): (38, None, self._decode_led_mimic),
+            # LCD Mimic Update line 1/2
+            (0x20, 0x17): (46, None, self._decode_lcd_mimic_line),
+            # LCD Mimic Update line 2/2
+            (0x20, 0x18): (46, None, self._decode_lcd_mimic_line),
+            # LCD Mimic Poll
+            (0x80, 0x90): (10, None, self._decode_lcd_mimic_poll),
+            # Appears to be a heartbeat from the panel
+            (0x80, 0x22): (2, None, self._decode_heartbeat),
+            # Unknown
+            (0x11, 0x41): (6, None, None),
+            # Unknown
+            (0xA0, 0x88): (14, None, None),
+            # LCD Mimic 0 Response
+            (0x40, 0x40): (10, None, self._decode_lcd_mimic_response),
+            # Unknown
+            (0x1C, 0x22): (36, None, None),
+            # Unknown 0x47 0x31 0x97
+            (0x47, 0x31): (3, 0x97, None),
+            # Unknown 0x83 0x31 0x97
+            (0x83, 0x31): (3, 0x97, None),
+        }
 
         self._lcd_led_names = [
             "normal",
@@ -58,6 +134,76 @@ class PertronicF100AMimic:
             "walk_test": [],
         }
         self._lcd_callbacks = []
+        self._led_change_callbacks = []
+        self._subscriptions = ()
+
+        # Priority lane: transitions on these LEDs are dispatched before any
+        # bulk LED / LCD text callbacks are run
+        self._alarm_led_names = ["fire", "evacuate", "defect", "silence_alarms"]
+        self._alarm_callbacks = []
+
+        self.stats = {
+            "alarm_events": 0,
+            # Time from the end of the read holding the frame to the alarm
+            # callbacks having run, time spent waiting in the kernel before
+            # the read is not included
+            "alarm_decode_latency_ms_last": None,
+            "alarm_decode_latency_ms_max": None,
+            "alarm_decode_latency_ms_avg": None,
+            "polls_answered": 0,
+            "polls_yielded": 0,
+            "polls_unanswered": 0,
+            "bytes_skipped": 0,
+            "decode_errors": 0,
+            "frames_checked": 0,
+            "frames_rejected": 0,
+            "bus_error_ratio": 0.0,
+            "reads": 0,
+            "bytes_received": 0,
+            "rx_buffer_size": len(self._rx_buffer),
+        }
+
+        self._verify_frames = verify_frames
+        # Check bytes of LED / LCD frames, learnt from the first frames
+        self._frame_checks = {
+            "led": PertronicFrameCheck(
+                "LED mimic", len(LedMimicFrame.HEADER), enforce=verify_frames
+            ),
+            "lcd": PertronicFrameCheck(
+                "LCD line",
+                LcdLineFrame.TEXT_OFFSET,
+                LcdLineFrame.CHECK_END,
+                enforce=verify_frames,
+            ),
+        }
+
+        # Per LED transition statistics and flap detection
+        self.activity = PertronicLedActivity()
+
+        # Liveness, all times are monotonic milliseconds
+        self._liveness_timeout_ms = liveness_timeout * 1000
+        self._available = False
+        self._availability_callbacks = []
+        self._liveness_callbacks = []
+        self.frame_timing = {
+            "heartbeat": self._new_frame_timing(),
+            "led": self._new_frame_timing(),
+            "lcd": self._new_frame_timing(),
+        }
+
+        # Active mode, answer LCD mimic polls when no physical mimic does
+        self._active_mode = active_mode
+        self._turnaround_ms = turnaround_ms
+        self._tx_scheduler = None
+        self._last_rx_ms = None
+        self._last_tx_frame = None
+        self._last_tx_ms = None
+        # Our own frame read back from the bus arrives within a few ms of
+        # writing it, anything later is another device
+        self._echo_window_ms = 50
+        self._mimic_response = mimic_response
+        self._mimic_response_ms = None
+        self._mimic_yield_ms = 5000
 
         self._run = False
         self._run_thread = None
@@ -99,192 +245,260 @@ class PertronicF100AMimic:
     def start(self):
         if self.test_connection():
             self._run = True
-            self._run_thread = Thread(target=self.__run, args=())
+            self._stop_event.clear()
+            if self._active_mode:
+                self._start_tx_scheduler()
+            self._run_thread = Thread(
+                target=self.__run, args=(), name="pertronic_io", daemon=True
+            )
             self._run_thread.start()
             return True
 
         return False
 
-    def stop(self):
+    def _start_tx_scheduler(self):
+        self._tx_scheduler = PertronicTxScheduler(
+            self._write,
+            lambda: self._last_rx_ms,
+            self._turnaround_ms,
+            max_late_ms=self._turnaround_ms * 10,
+        )
+        self._tx_scheduler.start()
+
+    def stop(self, timeout=None):
+        """Stop the reader and release the connection.
+
+        Waits up to timeout seconds in total for the transmit and reader
+        threads, returns False if either is still running after that.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
         self._run = False
-        self._run_thread.join()  # force the thread to exit
+        self._stop_event.set()
+        self._transport.interrupt()
+        self._close_subscriptions()
+
+        stopped = True
+        if self._tx_scheduler is not None:
+            stopped = self._tx_scheduler.stop(timeout)
+            self._tx_scheduler = None
+
+        if self._run_thread is not None:
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+            self._run_thread.join(timeout)
+            if self._run_thread.is_alive():
+                stopped = False
+            else:
+                self._run_thread = None
+
+        if not stopped:
+            self.log.warning(
+                "Threads did not stop within the timeout, closing connection"
+            )
+            # Fails the blocked call in the reader or writer so it can exit
+            self._transport.close()
+        return stopped
 
     def __run(self):
         self._io_loop()
 
     def _io_loop(self):
-        io = socket.create_connection([self._host_ip, self._host_port])
-        self.log.info("Starting IO loop")
-        while self._run:
-            self._io_buffer = []
+        io = self._transport
+        while True:
+            try:
+                io.open()
+                break
+            except Exception as e:
+                self.log.error("Unable to open connection - {}".format(e))
+                io.close()
+                if self._stop_event.wait(self._reconnect_delay):
+                    return
+
+        self.log.info("Starting IO loop on {}".format(io))
+        try:
+            self._read_loop(io)
+        finally:
+            io.close()
 
+    def _read_loop(self, io):
+        while self._run:
             if not self._run:
-                return
+                break
 
+            # Sleeps in poll() until data arrives, then takes everything
+            # already buffered so a burst of frames is decoded in one pass
+            fill = self._rx_fill
             try:
-                io.settimeout(1)
-                self._io_buffer = io.recv(500)
-            except socket.timeout:
-                self.log.warning("Socket timed out")
+                count = io.read_into(self._rx_view[fill:], self._silence_timeout)
+            except EOFError:
+                self.log.info("End of input from {}".format(io))
+                self._run = False
+                break
+            except (TimeoutError, ConnectionError, OSError) as e:
+                if not self._run:
+                    break
+                self.log.warning("Connection lost - {}".format(e))
                 io.close()
-                time.sleep(10)
+                # The stream is discontinuous, drop any partial frame
+                self._rx_fill = 0
+                if self._stop_event.wait(self._reconnect_delay):
+                    break
                 try:
-                    io = socket.create_connection([self._host_ip, self._host_port])
+                    io.open()
                 except Exception as e:
                     self.log.error("Unable to reopen connection")
                     self.log.error(e)
-
-            self._bytes_available = len(self._io_buffer)
-            self._decodes = 0
-            # print(_byte_hex_str(io_buffer))
+                continue
+
+            if not count:
+                continue  # Interrupted
+
+            self._rx_time_ms = self._last_rx_ms = current_monotonic_milli_time()
+            self.stats["reads"] += 1
+            self.stats["bytes_received"] += count
+            # The read filled all the free space, the burst was bigger than the
+            # buffer so grow it for next time
+            full = fill + count == len(self._rx_buffer)
+            self._rx_fill = fill + count
+            self._decode_rx_buffer()
+            if full:
+                self._grow_rx_buffer(len(self._rx_buffer) * 2)
+
+    def _grow_rx_buffer(self, size):
+        size = min(size, self._rx_buffer_max)
+        if size <= len(self._rx_buffer):
+            return
+        buffer = bytearray(size)
+        buffer[: self._rx_fill] = self._rx_buffer[: self._rx_fill]
+        self._rx_buffer = buffer
+        self._rx_view = memoryview(buffer)
+        self.stats["rx_buffer_size"] = size
+        self.log.debug("Receive buffer grown to {} bytes".format(size))
+
+    def decode_bytes(self, data):
+        """Decode a chunk of bytes from the bus, see _decode_rx_buffer"""
+        count = len(data)
+        if self._rx_fill + count > len(self._rx_buffer):
+            self._grow_rx_buffer(self._rx_fill + count)
+            if self._rx_fill + count > len(self._rx_buffer):
+                # Bigger than the buffer can ever be, decode it in pieces
+                step = len(self._rx_buffer) - self._rx_fill
+                self.decode_bytes(data[:step])
+                self.decode_bytes(data[step:])
+                return
+        self._rx_buffer[self._rx_fill : self._rx_fill + count] = data
+        self._rx_fill += count
+        self._decode_rx_buffer()
+
+    def _decode_rx_buffer(self):
+        """Decode the bytes in the receive buffer.
+
+        A frame split across reads is kept and completed by the next chunk.
+        Bytes that do not start a known frame are skipped one at a time until
+        the decoder is back in sync. Every step consumes at least one byte, so
+        the work per byte is bounded whatever the input. An exception while
+        processing one frame is logged and does not affect the other frames
+        in the chunk.
+        """
+        buf = self._rx_buffer
+        view = self._rx_view
+        end = self._rx_fill
+        pos = 0
+        # print(_byte_hex_str(view[:end]))
+
+        while end - pos >= 2:
+            decoder = self._frame_decoders.get((buf[pos], buf[pos + 1]))
+            if decoder is None:
+                # self.log.warning("No decoder for: {}".format(_byte_hex_str(view[pos:end])))
+                pos += 1
+                self.stats["bytes_skipped"] += 1
+                continue
+
+            length, third_byte, handler = decoder
+            if end - pos < max(length, 3 if third_byte is not None else 2):
+                break  # Incomplete, wait for the rest of the frame
+
+            if third_byte is not None and buf[pos + 2] != third_byte:
+                pos += 1
+                self.stats["bytes_skipped"] += 1
+                continue
+
+            frame = view[pos : pos + length]
+            pos += length
+            if handler is None:
+                continue
 
             try:
-                while self._bytes_available > 0:
-                    last_decodes = self._decodes
-
-                    if not self._run:
-                        return
-
-                    if len(self._io_buffer) < 2:
-                        break
-
-                    # LED Mimic Status update
-                    # 0x19 0x24
-                    if self._io_buffer[0] == 0x19 and self._io_buffer[1] == 0x24:
-                        length = 38
-                        pkt = self._get_io_bytes(length)
-                        self.process_led_mimic_packet(pkt)
-                        continue
-
-                    # LCD Mimic Update line 1/2
-                    # 0x20 0x17
-                    if self._io_buffer[0] == 0x20 and self._io_buffer[1] == 0x17:
-                        length = 46
-                        pkt = self._get_io_bytes(length)
-                        self.process_lcd_mimic_line(pkt)
-                        continue
-
-                    # LCD Mimic Update line 2/2
-                    # 0x20 0x18
-                    if self._io_buffer[0] == 0x20 and self._io_buffer[1] == 0x18:
-                        length = 46
-                        pkt = self._get_io_bytes(length)
-                        self.process_lcd_mimic_line(pkt)
-                        continue
-
-                    # Unknown
-                    # 0x20 0x19
-                    if (
-                        self._io_buffer[0] == 0x20
-                        and self._io_buffer[1] == 0x19
-                        and False
-                    ):
-                        length = 5
-                        pkt = self._get_io_bytes(length)
-                        self.process_lcd_mimic_line(pkt)
-                        continue
-
-                    # LCD Mimic Poll
-                    # 0x80 0x90
-                    if self._io_buffer[0] == 0x80 and self._io_buffer[1] == 0x90:
-                        length = 10
-                        # print("LCD Mimic Poll")
-
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # Appears to be a heartbeat from the panel
-                    # 0x80 0x22
-                    if self._io_buffer[0] == 0x80 and self._io_buffer[1] == 0x22:
-                        length = 2
-                        # self.log.debug("Panel Heartbeat")
-                        pkt = self._get_io_bytes(length)
-                        self.decoded_data["heartbeat"]["status"] = True
-                        self.decoded_data["heartbeat"]["timestamp"] = int(time.time())
-                        continue
-
-                    # Unknown
-                    # 0x11 0x41
-                    if self._io_buffer[0] == 0x11 and self._io_buffer[1] == 0x41:
-                        length = 6
-                        # print("Unknown 0x11 0x41")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # Unknown
-                    # 0xA0 0x88
-                    if self._io_buffer[0] == 0xA0 and self._io_buffer[1] == 0x88:
-                        length = 14
-                        # print("Unknown 0xA0 0x88")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # LCD Mimic 0 Response
-                    # 0x40 0x40
-                    if self._io_buffer[0] == 0x40 and self._io_buffer[1] == 0x40:
-                        length = 10
-                        # print("LCD Mimic 0 Response")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # Unknown
-                    # 0x1c 0x22
-                    if self._io_buffer[0] == 0x1C and self._io_buffer[1] == 0x22:
-                        length = 36
-                        # print("Unknown 0x1C 0x22")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # Unknown
-                    # 0x47 0x31 0x97
-                    if (
-                        self._io_buffer[0] == 0x47
-                        and self._io_buffer[1] == 0x31
-                        and self._io_buffer[2] == 0x97
-                    ):
-                        length = 3
-                        # print("Unknown 0x47 0x31 0x97")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    # Unknown
-                    # 0x83 0x31 0x97
-                    if (
-                        self._io_buffer[0] == 0x83
-                        and self._io_buffer[1] == 0x31
-                        and self._io_buffer[2] == 0x97
-                    ):
-                        length = 3
-                        # print("Unknown 0x83 0x31 0x97")
-                        pkt = self._get_io_bytes(length)
-                        continue
-
-                    if last_decodes == self._decodes:
-                        # self.log.warning(
-                        #    "No decoder for: {}".format(_byte_hex_str(self._io_buffer))
-                        # )
-                        break
-
+                handler(frame)
             except Exception as e:
+                self.stats["decode_errors"] += 1
                 self.log.error(
-                    "Error processing bytes: {}".format(_byte_hex_str(self._io_buffer))
+                    "Error processing frame: {}".format(_byte_hex_str(frame))
                 )
                 self.log.error(e)
                 self.log.error(traceback.format_exc())
 
-    def _get_io_bytes(self, length):
-        # allow continued decoding of the packet
-        self._bytes_available -= length
-        self._decodes += 1
-        output = self._io_buffer[:length]
-        self.io_buffer = self._io_buffer[length:]
-        return output
+        # At most one partial frame is carried over to the front of the buffer
+        remaining = end - pos
+        if remaining and pos:
+            buf[:remaining] = buf[pos:end]
+        self._rx_fill = remaining
+        self._end_of_read()
+
+    def _end_of_read(self):
+        """Called once all frames from a read have been decoded"""
+
+    def _decode_led_mimic(self, view):
+        frame = LedMimicFrame(view, self._rx_time_ms)
+        self.process_led_mimic_packet(frame, self._rx_time_ms)
+
+    def _decode_lcd_mimic_line(self, view):
+        frame = LcdLineFrame(view, self._rx_time_ms)
+        self.process_lcd_mimic_line(frame, self._rx_time_ms)
+
+    def _decode_lcd_mimic_poll(self, view):
+        self.process_lcd_mimic_poll(view, self._rx_time_ms)
+
+    def _decode_lcd_mimic_response(self, view):
+        self.process_lcd_mimic_response(view, self._rx_time_ms)
+
+    def _decode_heartbeat(self, view):
+        # self.log.debug("Panel Heartbeat")
+        self.process_heartbeat(HeartbeatFrame(view, self._rx_time_ms))
 
     def register_lcd_callback(self, function):
         self.log.debug("Adding LCD callback function {}".format(function.__name__))
         self._lcd_callbacks.append(function)
         return True
 
+    def register_alarm_callback(self, function):
+        """Register a priority callback for alarm LED transitions.
+
+        The function is called as function(led_type, state, decode_latency_ms) as
+        soon as a transition is decoded, before any other LED or LCD callbacks are
+        run. decode_latency_ms is measured from the end of the read that received
+        the frame. The first state seen after starting is not a transition and
+        is not reported.
+        """
+        self.log.debug("Adding alarm callback function {}".format(function.__name__))
+        self._alarm_callbacks.append(function)
+        return True
+
+    def register_availability_callback(self, function):
+        """Called as function(available) when the panel goes stale or recovers"""
+        self._availability_callbacks.append(function)
+        return True
+
+    def register_liveness_callback(self, function):
+        """Called as function(frame_timing) on every liveness check"""
+        self._liveness_callbacks.append(function)
+        return True
+
+    def register_led_change_callback(self, function):
+        """Called as function(led_id, state) for every addressable LED change"""
+        self._led_change_callbacks.append(function)
+        return True
+
     def register_led_callback(self, led, function):
         self.log.debug(
             "Adding LED {} callback function {}".format(led, function.__name__)
@@ -294,17 +508,409 @@ class PertronicF100AMimic:
         self._led_callbacks[led].append(function)
         return True
 
-    def process_led_mimic_packet(self, pkt):
-        if pkt[0] != 0x19 or pkt[1] != 0x24 or len(pkt) != 38:
+    def unregister_callback(self, function):
+        """Remove function from every callback list it was registered with"""
+        removed = False
+        for callbacks in (
+            self._lcd_callbacks,
+            self._alarm_callbacks,
+            self._availability_callbacks,
+            self._liveness_callbacks,
+            self._led_change_callbacks,
+            *self._led_callbacks.values(),
+        ):
+            while function in callbacks:
+                callbacks.remove(function)
+                removed = True
+        return removed
+
+    def subscribe(self, filter=None, queue_size: int = 100):
+        """Subscribe to state diffs, must be called from the consuming event loop.
+
+        Returns an async iterator of LedDiff, SpecialLedDiff, LcdDiff and
+        HeartbeatDiff, see PertronicSubscribe. Call close() on it, or use it
+        with async with, to stop receiving diffs.
+        """
+        subscription = PertronicSubscription(
+            self, asyncio.get_running_loop(), filter, queue_size
+        )
+        # Replaced rather than modified, the reader iterates it without a lock
+        self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def _remove_subscription(self, subscription):
+        self._subscriptions = tuple(
+            s for s in self._subscriptions if s is not subscription
+        )
+
+    def _close_subscriptions(self):
+        """Ends any async for over a subscription, run when stopping"""
+        for subscription in self._subscriptions:
+            subscription.close()
+
+    def _publish(self, diff):
+        for subscription in self._subscriptions:
+            try:
+                if subscription.wants(diff):
+                    subscription.publish(diff)
+            except Exception as e:
+                self.log.error("Unable to publish {} - {}".format(diff, e))
+
+    def _process_special_leds(self, frame, rx_time_ms):
+        """Decode the special LED bytes of a frame and dispatch the changes.
+
+        Both LED and LCD mimic frames carry special LEDs, decoded through the
+        lookup tables in PertronicFrames. Only the LEDs whose bits differ from
+        the previous byte at the same place are applied, so the merged state
+        follows the latest transition from either source rather than flipping
+        between them on every frame when they disagree.
+
+        Returns the states of every LED in the changed bytes, as this frame
+        shows them, empty when nothing changed.
+        """
+        view = frame.raw
+        previous = self._special_led_bytes
+        leds_dict = self.decoded_data["lcd"]["leds"]
+        leds_dict["timestamp"] = int(time.time())
+
+        frame_states = {}
+        states = {}
+        for offset, table in frame.SPECIAL_LED_TABLES:
+            key = (frame.HEADER, offset)
+            byte = view[offset]
+            previous_byte = previous.get(key)
+            if previous_byte == byte:
+                continue
+            previous[key] = byte
+            # Every LED in a byte is new the first time it is seen
+            changed_bits = 0xFF if previous_byte is None else byte ^ previous_byte
+            for led_name, mask, state in table[byte]:
+                frame_states[led_name] = state
+                if mask & changed_bits:
+                    states[led_name] = state
+
+        if not states:
+            return frame_states
+
+        self._dispatch_alarm_transitions(leds_dict, states, rx_time_ms)
+
+        states["normal"] = not (leds_dict["fire"] or leds_dict["defect"])
+        for led_name, state in states.items():
+            if leds_dict[led_name] == state:
+                continue
+            if self._subscriptions:
+                self._publish(
+                    SpecialLedDiff(
+                        current_milli_time(), led_name, leds_dict[led_name], state
+                    )
+                )
+            leds_dict[led_name] = state
+
+            for callback in self._led_callbacks[led_name]:
+                try:
+                    callback(state)
+                except Exception as e:
+                    self.log.error(
+                        "Unable to process LED callback {} - {}".format(led_name, e)
+                    )
+        return frame_states
+
+    def _dispatch_alarm_transitions(self, leds_dict, new_states, rx_time_ms):
+        """Priority lane: update the alarm LEDs and dispatch any transitions.
+
+        Runs before the bulk LED / LCD callbacks so an alarm is never queued
+        behind unchanged LEDs. The first state of an LED only seeds it, no alarm
+        callbacks are run and no latency is recorded.
+        """
+        changed = []
+        for led_name in self._alarm_led_names:
+            if led_name not in new_states:
+                continue
+            state = new_states[led_name]
+            previous = leds_dict[led_name]
+            if previous == state:
+                continue
+            if self._subscriptions:
+                self._publish(
+                    SpecialLedDiff(current_milli_time(), led_name, previous, state)
+                )
+            leds_dict[led_name] = state
+            if previous is None:
+                self._run_led_callbacks(led_name, state)
+                continue
+            changed.append(led_name)
+
+        if not changed:
+            return
+
+        if rx_time_ms is None:
+            rx_time_ms = current_monotonic_milli_time()
+
+        for led_name in changed:
+            state = leds_dict[led_name]
+            decode_latency_ms = current_monotonic_milli_time() - rx_time_ms
+            for callback in self._alarm_callbacks:
+                try:
+                    callback(led_name, state, decode_latency_ms)
+                except Exception as e:
+                    self.log.error(
+                        "Unable to process alarm callback {} - {}".format(led_name, e)
+                    )
+                    self.log.error(traceback.format_exc())
+
+            for callback in self._led_callbacks[led_name]:
+                try:
+                    callback(state)
+                except Exception as e:
+                    self.log.error(
+                        "Unable to process LED callback {} - {}".format(led_name, e)
+                    )
+
+            self._record_alarm_latency(current_monotonic_milli_time() - rx_time_ms)
+
+    def _record_alarm_latency(self, latency_ms):
+        stats = self.stats
+        count = stats["alarm_events"] + 1
+        stats["alarm_events"] = count
+        stats["alarm_decode_latency_ms_last"] = latency_ms
+        if (
+            stats["alarm_decode_latency_ms_max"] is None
+            or latency_ms > stats["alarm_decode_latency_ms_max"]
+        ):
+            stats["alarm_decode_latency_ms_max"] = latency_ms
+        if stats["alarm_decode_latency_ms_avg"] is None:
+            stats["alarm_decode_latency_ms_avg"] = float(latency_ms)
+        else:
+            # Running mean over all alarm events
+            stats["alarm_decode_latency_ms_avg"] += (
+                latency_ms - stats["alarm_decode_latency_ms_avg"]
+            ) / count
+
+    @staticmethod
+    def _new_frame_timing():
+        return {"count": 0, "last_ms": None, "interval_ms": None, "jitter_ms": None}
+
+    def _record_frame_arrival(self, frame_type, rx_time_ms):
+        if rx_time_ms is None:
+            rx_time_ms = current_monotonic_milli_time()
+
+        timing = self.frame_timing[frame_type]
+        timing["count"] += 1
+        last_ms = timing["last_ms"]
+        timing["last_ms"] = rx_time_ms
+        if last_ms is None:
+            return
+
+        interval = rx_time_ms - last_ms
+        if timing["interval_ms"] is None:
+            timing["interval_ms"] = float(interval)
+            timing["jitter_ms"] = 0.0
+            return
+
+        # Smoothed inter-arrival time and jitter (RFC 3550 style estimator)
+        deviation = abs(interval - timing["interval_ms"])
+        timing["interval_ms"] += (interval - timing["interval_ms"]) / 8
+        timing["jitter_ms"] += (deviation - timing["jitter_ms"]) / 16
+
+    def _record_frame_check(self, valid):
+        """Count a checked frame, returns valid"""
+        stats = self.stats
+        stats["frames_checked"] += 1
+        if not valid:
+            stats["frames_rejected"] += 1
+        # Smoothed share of rejected frames, reacts within a few dozen frames
+        stats["bus_error_ratio"] += ((not valid) - stats["bus_error_ratio"]) / 64
+        return valid
+
+    def check_liveness(self, now_ms=None):
+        """Re-evaluate panel availability, intended to be run from a single timer.
+
+        The panel is available while any frame has arrived within the liveness
+        timeout. Availability callbacks are only run on a change of state.
+        """
+        if now_ms is None:
+            now_ms = current_monotonic_milli_time()
+
+        last_ms = None
+        for timing in self.frame_timing.values():
+            if timing["last_ms"] is not None and (
+                last_ms is None or timing["last_ms"] > last_ms
+            ):
+                last_ms = timing["last_ms"]
+
+        available = last_ms is not None and (
+            now_ms - last_ms <= self._liveness_timeout_ms
+        )
+
+        if available != self._available:
+            self._available = available
+            if available:
+                self.log.info("Panel is available")
+            else:
+                self.log.warning(
+                    "No frames from panel for {}ms, marking unavailable".format(
+                        self._liveness_timeout_ms
+                    )
+                )
+            for callback in self._availability_callbacks:
+                try:
+                    callback(available)
+                except Exception as e:
+                    self.log.error(
+                        "Unable to process availability callback - {}".format(e)
+                    )
+
+        # Publish the held back state of flapping LEDs that are now due
+        for led_id, state in self.activity.flush(now_ms):
+            self._run_led_callbacks(led_id, state)
+
+        for callback in self._liveness_callbacks:
+            try:
+                callback(self.frame_timing)
+            except Exception as e:
+                self.log.error("Unable to process liveness callback - {}".format(e))
+
+        return available
+
+    @property
+    def available(self):
+        return self._available
+
+    def get_heartbeat_rate(self):
+        """Heartbeats per minute, None until two heartbeats have been seen"""
+        interval = self.frame_timing["heartbeat"]["interval_ms"]
+        if not interval:
+            return None
+        return 60000 / interval
+
+    def get_heartbeat_jitter(self):
+        return self.frame_timing["heartbeat"]["jitter_ms"]
+
+    def get_bus_error_rate(self):
+        """Percentage of recent LED / LCD frames rejected as corrupt"""
+        return self.stats["bus_error_ratio"] * 100
+
+    def get_flapping_leds(self):
+        """Addressable LEDs currently flagged as flapping"""
+        return self.activity.get_flapping()
+
+    def get_led_transitions(self):
+        """Addressable LED transitions within the activity window"""
+        return self.activity.get_total_transitions(current_monotonic_milli_time())
+
+    def get_led_activity(self, led_id: int):
+        now_ms = current_monotonic_milli_time()
+        return {
+            "flapping": self.activity.is_flapping(led_id),
+            "transitions": self.activity.get_transitions(led_id, now_ms),
+            "on_time_s": self.activity.get_on_time_ms(led_id, now_ms) // 1000,
+        }
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats.update(self.activity.stats)
+        for frame_type, frame_check in self._frame_checks.items():
+            stats["checksum_{}".format(frame_type)] = frame_check.check_name
+        # Seen from a physical mimic or configured, for the mimic response option
+        if self._mimic_response is not None:
+            stats["mimic_response"] = self._mimic_response.hex(" ")
+        else:
+            stats["mimic_response"] = None
+        if self._tx_scheduler is not None:
+            stats.update(self._tx_scheduler.stats)
+        return stats
+
+    def _write(self, data):
+        self._transport.write(data)
+        self._last_tx_frame = bytes(data)
+        self._last_tx_ms = current_monotonic_milli_time()
+
+    def _is_own_echo(self, pkt, rx_time_ms):
+        return (
+            self._last_tx_ms is not None
+            and pkt == self._last_tx_frame
+            and rx_time_ms - self._last_tx_ms <= self._echo_window_ms
+        )
+
+    def process_lcd_mimic_response(self, pkt, rx_time_ms=None):
+        """A physical mimic (or our own echo) answered a poll.
+
+        Any response that is not the echo of what we have just sent is taken
+        to be a physical mimic, even one identical to our last frame, so we
+        back off as soon as one returns to the bus.
+        """
+        if len(pkt) != 10:
+            return
+        if rx_time_ms is None:
+            rx_time_ms = current_monotonic_milli_time()
+        if self._is_own_echo(pkt, rx_time_ms):
+            return
+        self._mimic_response = bytes(pkt)
+        self._mimic_response_ms = rx_time_ms
+
+    def process_lcd_mimic_poll(self, pkt, rx_time_ms=None):
+        """Answer an LCD mimic poll when in active mode.
+
+        We stay quiet while a physical mimic has answered recently, so the two
+        never talk over each other. The response layout is not decoded, the
+        last response seen from a physical mimic is replayed, or the configured
+        response before one has been seen. With neither polls are left
+        unanswered rather than guessing at a response the panel may not accept.
+        """
+        if self._tx_scheduler is None or len(pkt) != 10:
+            return
+        if rx_time_ms is None:
+            rx_time_ms = current_monotonic_milli_time()
+
+        if (
+            self._mimic_response_ms is not None
+            and rx_time_ms - self._mimic_response_ms < self._mimic_yield_ms
+        ):
+            self.stats["polls_yielded"] += 1
+            return
+
+        response = self._mimic_response
+        if response is None:
+            self.stats["polls_unanswered"] += 1
+            return
+        self._tx_scheduler.schedule(response, rx_time_ms)
+        self.stats["polls_answered"] += 1
+
+    def process_heartbeat(self, frame):
+        self._record_frame_arrival("heartbeat", frame.rx_time_ms)
+        self.decoded_data["heartbeat"]["status"] = True
+        self.decoded_data["heartbeat"]["timestamp"] = int(time.time())
+        if self._subscriptions:
+            self._publish(HeartbeatDiff(current_milli_time()))
+
+    def process_led_mimic_packet(self, pkt, rx_time_ms=None):
+        frame = pkt if isinstance(pkt, LedMimicFrame) else LedMimicFrame(pkt)
+        if not frame.is_valid():
             self.log.warning("Error: Invalid LED Mimic PKT")
+            self._record_frame_check(False)
+            return
+
+        if not self._record_frame_check(self._frame_checks["led"].verify(frame.raw)):
+            self.log.debug(
+                "Rejected corrupt LED mimic frame: {}".format(_byte_hex_str(frame.raw))
+            )
             return
 
-        self.decoded_data["led"]["timestamp"] = int(time.time())
-        self.decoded_data["led"]["silence_alarms"] = bool(pkt[2] & 0x04)
-        self.decoded_data["led"]["evacuate"] = bool(pkt[2] & 0x02)
-        self.decoded_data["led"]["defect"] = bool(pkt[2] & 0x40)
-        self.decoded_data["led"]["fire"] = bool(pkt[2] & 0x80)
-        self.decoded_data["led"]["normal"] = bool(not (pkt[2] & 0x40 or pkt[2] & 0x80))
+        self._process_led_frame(frame, rx_time_ms)
+
+    def _process_led_frame(self, frame, rx_time_ms):
+        """Apply a validated LED mimic frame to the decoded state"""
+        self._record_frame_arrival("led", rx_time_ms)
+
+        # Special LEDs first, alarm transitions are dispatched from there
+        states = self._process_special_leds(frame, rx_time_ms)
+
+        led_dict = self.decoded_data["led"]
+        led_dict["timestamp"] = int(time.time())
+        if states:
+            led_dict.update(states)
+            # This frame's own view, the merged normal can differ
+            led_dict["normal"] = not (states["fire"] or states["defect"])
 
         """
         if pkt[2] & 0x04:
@@ -323,66 +929,109 @@ class PertronicF100AMimic:
             self.log.debug("LED Status: Normal")
         """
 
-        led_offset = 4
-        for i in range(32):
-            byte = pkt[led_offset + i]
+        self._process_led_bitmap(frame.led_bytes)
+
+    def _process_led_bitmap(self, led_bytes):
+        """Update the addressable LEDs and run callbacks for those that changed.
+
+        Only bytes that differ from the previous bitmap are unpacked, so a quiet
+        bus does not touch the per-LED state at all.
+        """
+        previous = self._led_bitmap
+        if previous is not None and previous == led_bytes:
+            return
+        self._led_bitmap = bytes(led_bytes)
+
+        addressable_leds = self.decoded_data["led"]["addressable_leds"]
+        activity = self.activity
+        now_ms = current_monotonic_milli_time()
+        for i in range(len(led_bytes)):
+            byte = led_bytes[i]
+            if previous is None:
+                changed = 0xFF
+            else:
+                changed = byte ^ previous[i]
+                if not changed:
+                    continue
 
             for j in range(8):
-                led_id = (i * 8) + j
                 pos = 1 << j
+                if not changed & pos:
+                    continue
+
+                led_id = (i * 8) + j
                 val = bool(byte & pos)
-                self.decoded_data["led"]["addressable_leds"][led_id] = val
+                if self._subscriptions:
+                    self._publish(
+                        LedDiff(
+                            current_milli_time(), led_id, addressable_leds[led_id], val
+                        )
+                    )
+                addressable_leds[led_id] = val
                 if val:
                     self.log.debug("LED_{}".format(led_id + 1))
 
-                callbacks = self._led_callbacks[led_id]
-                for callback in callbacks:
+                for callback in self._led_change_callbacks:
                     try:
-                        callback(bool(val))
-
+                        callback(led_id, val)
                     except Exception as e:
                         self.log.error(
-                            "Unable to process LED {} callback {}  - {}".format(
-                                led_id, e
-                            )
+                            "Unable to process LED change callback - {}".format(e)
                         )
-                        self.log.error(traceback.format_exc())
 
-    def process_lcd_mimic_line(self, pkt):
-        if not (
-            pkt[0] == 0x20 and (pkt[1] == 0x17 or pkt[1] == 0x18) and len(pkt) == 46
-        ):
-            self.log.error("Invalid mimic line pkt: {}".format(_byte_hex_str(pkt)))
+                # Entity updates of a flapping LED are rate limited
+                if activity.record(led_id, val, now_ms, previous is not None):
+                    self._run_led_callbacks(led_id, val)
+
+    def _run_led_callbacks(self, led_id, val):
+        for callback in self._led_callbacks[led_id]:
+            try:
+                callback(val)
+
+            except Exception as e:
+                self.log.error(
+                    "Unable to process LED {} callback - {}".format(led_id, e)
+                )
+                self.log.error(traceback.format_exc())
+
+    def process_lcd_mimic_line(self, pkt, rx_time_ms=None):
+        frame = pkt if isinstance(pkt, LcdLineFrame) else LcdLineFrame(pkt)
+        if not frame.is_valid():
+            self.log.error(
+                "Invalid mimic line pkt: {}".format(_byte_hex_str(frame.raw))
+            )
+            self._record_frame_check(False)
             return
 
-        line = (pkt[1] == 0x18) + 1
-        chars = pkt[2:42]
-        line_string = chars.decode("utf8")
-        line_string = line_string.lstrip(" ")  # Remove leading white space
-        line_string = line_string.rstrip(" ")  # Remove trailing white space
-        # self.log.debug("LCD Mimic Line {}: `{}`".format(line, line_string))
-        self.decoded_data["lcd"]["line_{}".format(line)]["display_text"] = line_string
-        self.decoded_data["lcd"]["line_{}".format(line)]["timestamp"] = int(time.time())
+        if not self._record_frame_check(self._frame_checks["lcd"].verify(frame.raw)):
+            self.log.debug(
+                "Rejected corrupt LCD line frame: {}".format(_byte_hex_str(frame.raw))
+            )
+            return
 
-        lcd_led_pkt = pkt[42:]
-        leds_dict = self.decoded_data["lcd"]["leds"]
-        leds_dict["timestamp"] = int(time.time())
+        self._process_lcd_frame(frame, rx_time_ms)
 
-        leds_dict["normal"] = bool(
-            not (lcd_led_pkt[3] & 0x02) and not (lcd_led_pkt[2] & 0x10)
-        )
-        leds_dict["defect"] = bool(lcd_led_pkt[2] & 0x10)
-        leds_dict["fire"] = bool(lcd_led_pkt[3] & 0x02)
+    def _process_lcd_frame(self, frame, rx_time_ms):
+        """Apply a validated LCD mimic line frame to the decoded state"""
+        self._record_frame_arrival("lcd", rx_time_ms)
 
-        leds_dict["silence_alarms"] = bool(lcd_led_pkt[3] & 0x10)
-        leds_dict["evacuate"] = bool(lcd_led_pkt[3] & 0x04)
+        self._process_special_leds(frame, rx_time_ms)
 
-        leds_dict["device_isolated"] = bool(lcd_led_pkt[2] & 0x01)
-        leds_dict["psu_defect"] = bool(lcd_led_pkt[2] & 0x02)
-        leds_dict["sprinkler"] = None  # TODO: Not yet decoded
-        leds_dict["door_holder_isolate"] = bool(lcd_led_pkt[2] & 0x80)
-        leds_dict["aux_isolate"] = bool(lcd_led_pkt[2] & 0x08)
-        leds_dict["walk_test"] = bool(lcd_led_pkt[2] & 0x20)
+        line = frame.line
+        line_dict = self.decoded_data["lcd"]["line_{}".format(line)]
+        line_dict["timestamp"] = int(time.time())
+
+        # Text is only decoded when the raw bytes change
+        text_changed = self._lcd_text_raw[line] != frame.text_bytes
+        if text_changed:
+            self._lcd_text_raw[line] = bytes(frame.text_bytes)
+            text = frame.text
+            if self._subscriptions:
+                self._publish(
+                    LcdDiff(current_milli_time(), line, line_dict["display_text"], text)
+                )
+            line_dict["display_text"] = text
+            # self.log.debug("LCD Mimic Line {}: `{}`".format(line, line_dict["display_text"]))
 
         # Global
         """
@@ -419,38 +1068,26 @@ class PertronicF100AMimic:
             self.log.debug("LCD: Walk Test")
         """
 
-        for callback in self._lcd_callbacks:
-            try:
-                # self.log.debug("Triggering LCD callback {}".format(i))
-                callback(self.get_lcd_text(1), self.get_lcd_text(2))
-            except Exception as e:
-                self.log.error("Unable to process LCD callback - {}".format(e))
-
-        for led_name in self._lcd_led_names:
-            callbacks = self._led_callbacks[led_name]
-            for callback in callbacks:
+        if text_changed:
+            for callback in self._lcd_callbacks:
                 try:
-                    # self.log.debug("Triggering LCD callback {}".format(led_name))
-                    callback(self.decoded_data["lcd"]["leds"][led_name])
+                    # self.log.debug("Triggering LCD callback {}".format(i))
+                    callback(self.get_lcd_text(1), self.get_lcd_text(2))
                 except Exception as e:
-                    self.log.error(
-                        "Unable to process LCD callback {}  - {}".format(led_name, e)
-                    )
+                    self.log.error("Unable to process LCD callback - {}".format(e))
 
     def test_connection(self, ip=None, port=None):
         if ip is None and port is None:
-            ip = self._host_ip
-            port = self._host_port
+            transport = self._transport
+        else:
+            transport = TcpTransport(ip, port)
 
-        self.log.info("Testing connection to TCP://{0}:{1}".format(ip, port))
+        self.log.info("Testing connection to {}".format(transport))
 
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(self._timeout)
-                s.connect((ip, port))
-                s.close()
-                self.log.info("Connection Successful")
-                return True
+            transport.test(self._timeout)
+            self.log.info("Connection Successful")
+            return True
 
         except Exception as e:
             self.log.error("Connection Test Failed")
@@ -477,6 +1114,11 @@ class PertronicF100AMimic:
         self.log = logging.getLogger(self.__class__.__name__)
         self.log.setLevel(logging.DEBUG)
 
+        # The logger is shared by every instance, a reloaded entry must not add
+        # another handler and print each line once more
+        if self.log.handlers:
+            return
+
         # Create handlers
         c_handler = logging.StreamHandler()
         c_handler.setFormatter(CustomFormatter())
@@ -488,6 +1130,9 @@ class PertronicF100AMimic:
         self.log.addHandler(c_handler)
         self.log.info("Logging Setup!")
 
+    def get_special_led_names(self):
+        return list(self._lcd_led_names)
+
     def register_special_led_callback(self, led_type, function):
         if led_type not in self._led_callbacks:
             return False
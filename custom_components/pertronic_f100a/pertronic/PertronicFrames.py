@@ -0,0 +1,209 @@
+"""Typed views over frames received from the F100A RS485 bus.
+
+Frames wrap a memoryview into the receive buffer and only decode a field when
+it is read, so a frame that nobody inspects costs a single small object. The
+view is only valid until the next read from the interface; copy anything that
+has to outlive the current decode pass.
+
+Special LEDs are described declaratively per frame type as
+(byte offset, ((name, mask), ...)). A lookup table with the decoded states for
+all 256 values of each byte is built once at import, so decoding a special LED
+byte is a single index.
+"""
+
+
+def special_led_table(bits):
+    """Precompute ((name, mask, state), ...) for every value of a special LED
+    byte"""
+    return tuple(
+        tuple((name, mask, bool(value & mask)) for name, mask in bits)
+        for value in range(256)
+    )
+
+
+class LedMimicFrame:
+    """LED Mimic Status update, 0x19 0x24"""
+
+    __slots__ = ("_view", "rx_time_ms")
+
+    HEADER = (0x19, 0x24)
+    LENGTH = 38
+    LED_OFFSET = 4
+    LED_BYTES = 32
+
+    SPECIAL_LED_BITS = (
+        (
+            2,
+            (
+                ("fire", 0x80),
+                ("defect", 0x40),
+                ("evacuate", 0x02),
+                ("silence_alarms", 0x04),
+            ),
+        ),
+    )
+    SPECIAL_LED_TABLES = tuple(
+        (offset, special_led_table(bits)) for offset, bits in SPECIAL_LED_BITS
+    )
+
+    def __init__(self, view, rx_time_ms=None):
+        self._view = view
+        self.rx_time_ms = rx_time_ms
+
+    def is_valid(self):
+        view = self._view
+        return (
+            len(view) == self.LENGTH
+            and view[0] == self.HEADER[0]
+            and view[1] == self.HEADER[1]
+        )
+
+    @property
+    def raw(self):
+        return self._view
+
+    @property
+    def status(self):
+        """The special LED byte"""
+        return self._view[2]
+
+    @property
+    def fire(self):
+        return bool(self._view[2] & 0x80)
+
+    @property
+    def defect(self):
+        return bool(self._view[2] & 0x40)
+
+    @property
+    def evacuate(self):
+        return bool(self._view[2] & 0x02)
+
+    @property
+    def silence_alarms(self):
+        return bool(self._view[2] & 0x04)
+
+    @property
+    def normal(self):
+        return not (self._view[2] & 0xC0)
+
+    @property
+    def led_bytes(self):
+        """Addressable LED bitmap, 8 LEDs per byte, LSB first"""
+        return self._view[self.LED_OFFSET : self.LED_OFFSET + self.LED_BYTES]
+
+    def led(self, led_id: int):
+        return bool(self._view[self.LED_OFFSET + (led_id >> 3)] & (1 << (led_id & 7)))
+
+
+class LcdLineFrame:
+    """LCD Mimic line update, 0x20 0x17 (line 1) or 0x20 0x18 (line 2)"""
+
+    __slots__ = ("_view", "rx_time_ms")
+
+    HEADER = 0x20
+    LINE_1 = 0x17
+    LINE_2 = 0x18
+    LENGTH = 46
+    TEXT_OFFSET = 2
+    TEXT_LENGTH = 40
+    # Bytes 44 and 45 are special LEDs, so any check bytes can only be 42-43
+    CHECK_END = 44
+
+    # Offsets 44 and 45 are LCD LED bytes 2 and 3, sprinkler is not decoded yet
+    SPECIAL_LED_BITS = (
+        (
+            44,
+            (
+                ("device_isolated", 0x01),
+                ("psu_defect", 0x02),
+                ("aux_isolate", 0x08),
+                ("defect", 0x10),
+                ("walk_test", 0x20),
+                ("door_holder_isolate", 0x80),
+            ),
+        ),
+        (
+            45,
+            (
+                ("fire", 0x02),
+                ("evacuate", 0x04),
+                ("silence_alarms", 0x10),
+            ),
+        ),
+    )
+    SPECIAL_LED_TABLES = tuple(
+        (offset, special_led_table(bits)) for offset, bits in SPECIAL_LED_BITS
+    )
+
+    def __init__(self, view, rx_time_ms=None):
+        self._view = view
+        self.rx_time_ms = rx_time_ms
+
+    def is_valid(self):
+        view = self._view
+        return (
+            len(view) == self.LENGTH
+            and view[0] == self.HEADER
+            and (view[1] == self.LINE_1 or view[1] == self.LINE_2)
+        )
+
+    @property
+    def raw(self):
+        return self._view
+
+    @property
+    def line(self):
+        return (self._view[1] == self.LINE_2) + 1
+
+    @property
+    def text_bytes(self):
+        return self._view[self.TEXT_OFFSET : self.TEXT_OFFSET + self.TEXT_LENGTH]
+
+    @property
+    def text(self):
+        """Display text with the padding removed"""
+        # A corrupt byte must not stop the rest of the line being shown
+        return bytes(self.text_bytes).decode("utf8", errors="replace").strip(" ")
+
+    @property
+    def led_bytes(self):
+        """The four LCD LED bytes trailing the text"""
+        return self._view[self.TEXT_OFFSET + self.TEXT_LENGTH :]
+
+
+def mimic_response_from_hex(text: str):
+    """Parse an LCD mimic response frame, e.g. "40 40 00 01 ...", raises
+    ValueError unless it is a complete 0x40 0x40 frame"""
+    frame = bytes.fromhex(text)
+    if len(frame) != MIMIC_RESPONSE_LENGTH or tuple(frame[:2]) != MIMIC_RESPONSE_HEADER:
+        raise ValueError(
+            "A mimic response is {} bytes starting 40 40".format(MIMIC_RESPONSE_LENGTH)
+        )
+    return frame
+
+
+# Response of LCD mimic 0 to a poll, the payload is not decoded
+MIMIC_RESPONSE_HEADER = (0x40, 0x40)
+MIMIC_RESPONSE_LENGTH = 10
+
+
+class HeartbeatFrame:
+    """Panel heartbeat, 0x80 0x22"""
+
+    __slots__ = ("_view", "rx_time_ms")
+
+    HEADER = (0x80, 0x22)
+    LENGTH = 2
+
+    def __init__(self, view, rx_time_ms=None):
+        self._view = view
+        self.rx_time_ms = rx_time_ms
+
+    def is_valid(self):
+        view = self._view
+        return (
+            len(view) == self.LENGTH
+            and view[0] == self.HEADER[0]
+            and view[1] == self.HEADER[1]
+        )
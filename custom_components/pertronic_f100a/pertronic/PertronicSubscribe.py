@@ -0,0 +1,137 @@
+"""Typed state diffs and asyncio subscriptions to them.
+
+    async with mimic.subscribe(filter=(LedDiff, SpecialLedDiff)) as diffs:
+        async for diff in diffs:
+            print(diff.t_ms, diff.led_id, diff.old, diff.new)
+
+Diffs are produced in the reader thread and handed to the subscriber's event
+loop with call_soon_threadsafe. Every subscription has a bounded queue, when a
+consumer falls behind new diffs are dropped and counted rather than holding up
+decoding. The filter runs in the reader thread so unwanted diffs never cross
+over to the event loop, a callable filter has to be quick.
+"""
+
+import asyncio
+from typing import NamedTuple, Optional
+
+
+class LedDiff(NamedTuple):
+    """Addressable LED change, old is None for the first state seen"""
+
+    t_ms: int
+    led_id: int
+    old: Optional[bool]
+    new: bool
+
+
+class SpecialLedDiff(NamedTuple):
+    """Special LED change, e.g. fire or defect"""
+
+    t_ms: int
+    name: str
+    old: Optional[bool]
+    new: bool
+
+
+class LcdDiff(NamedTuple):
+    """LCD line text change"""
+
+    t_ms: int
+    line: int
+    old: Optional[str]
+    new: str
+
+
+class HeartbeatDiff(NamedTuple):
+    t_ms: int
+
+
+_CLOSED = object()
+
+
+class PertronicSubscription:
+    def __init__(self, mimic, loop, filter=None, queue_size: int = 100):
+        """
+        filter:     a diff type, a tuple of diff types or function(diff) -> bool,
+                    None for every diff
+        """
+        self._mimic = mimic
+        self._loop = loop
+        if filter is None or isinstance(filter, (type, tuple)):
+            self._types = filter
+            self._match = None
+        else:
+            self._types = None
+            self._match = filter
+
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._queue_size = queue_size
+        # Diffs handed to the loop but not yet queued are sent - received,
+        # each counter is only written by one thread
+        self._sent = 0
+        self._received = 0
+        self._closed = False
+
+        self.dropped = 0
+
+    def wants(self, diff):
+        if self._types is not None and not isinstance(diff, self._types):
+            return False
+        return self._match is None or self._match(diff)
+
+    def publish(self, diff):
+        """Queue diff from the reader thread, never blocks"""
+        if self._closed:
+            return
+        in_flight = self._sent - self._received
+        if in_flight + self._queue.qsize() >= self._queue_size:
+            self.dropped += 1
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._put, diff)
+        except RuntimeError:
+            # The event loop has gone, nobody is listening any more
+            self.close()
+            return
+        self._sent += 1
+
+    def _put(self, diff):
+        self._received += 1
+        try:
+            self._queue.put_nowait(diff)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def close(self):
+        """Stop receiving diffs, an iterating consumer stops once the queue
+        has been drained"""
+        if self._closed:
+            return
+        self._closed = True
+        self._mimic._remove_subscription(self)
+        try:
+            self._loop.call_soon_threadsafe(self._wake_closed)
+        except RuntimeError:
+            pass
+
+    def _wake_closed(self):
+        if self._queue.full():
+            # Make room for the marker, a closed consumer loses the oldest diff
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        diff = await self._queue.get()
+        if diff is _CLOSED:
+            raise StopAsyncIteration
+        return diff
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,292 @@
+"""Byte transports between the decoder and the RS485 bus.
+
+All transports share the same contract so the decoder does not care where the
+bytes come from:
+
+    open() / close()
+    read_into(view, timeout)
+                    waits up to timeout seconds for data then fills view with
+                    everything already available, returning the byte count.
+                    Raises TimeoutError when nothing arrived, ConnectionError
+                    when the link dropped and EOFError at the end of a capture.
+                    Returns 0 when woken by interrupt()
+    interrupt()     wake a blocked read_into, used when stopping
+    write(data)
+"""
+
+import os
+import select
+import socket
+import stat
+import time
+
+try:
+    import serial
+    from serial.tools import list_ports
+except ImportError:  # pyserial is only needed for direct serial connections
+    serial = None
+    list_ports = None
+
+
+def list_serial_ports():
+    """Returns {device: description} for the serial ports on this machine"""
+    if list_ports is None:
+        return {}
+    return {
+        port.device: "{} - {}".format(port.device, port.description)
+        for port in sorted(list_ports.comports(), key=lambda p: p.device)
+    }
+
+
+class PertronicTransport:
+    # Seconds a write may block before it fails, a peer that stops reading must
+    # not hold up the transmit thread forever
+    write_timeout = 5
+
+    def open(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def read_into(self, view, timeout):
+        raise NotImplementedError
+
+    def interrupt(self):
+        pass
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def test(self, timeout):
+        """Returns True if the transport can be opened"""
+        self.open()
+        self.close()
+        return True
+
+
+class _PollingTransport(PertronicTransport):
+    """Shared wait for file descriptor based transports.
+
+    Reads are driven by poll() on the descriptor and a wake pipe, so an idle
+    reader sleeps until data arrives or it is interrupted rather than waking
+    on a fixed timeout.
+    """
+
+    def __init__(self):
+        self._poll = None
+        self._wake_r = None
+        self._wake_w = None
+
+    def _open_poll(self, fd):
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._poll = select.poll()
+        self._poll.register(fd, select.POLLIN)
+        self._poll.register(self._wake_r, select.POLLIN)
+
+    def _close_poll(self):
+        if self._wake_r is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+        self._poll = self._wake_r = self._wake_w = None
+
+    def interrupt(self):
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\x00")
+            except OSError:
+                pass
+
+    def _wait(self, timeout):
+        """Returns True when readable, False when interrupted"""
+        events = self._poll.poll(timeout * 1000)
+        if not events:
+            raise TimeoutError("No data from {}".format(self))
+        for fd, _ in events:
+            if fd == self._wake_r:
+                try:
+                    os.read(self._wake_r, 64)
+                except BlockingIOError:
+                    pass
+                return False
+        return True
+
+
+class TcpTransport(_PollingTransport):
+    """RS485 to Ethernet interface"""
+
+    connect_timeout = 10
+
+    def __init__(self, host: str, port: int):
+        super().__init__()
+        self._host = host
+        self._port = port
+        self._socket = None
+
+    def __str__(self):
+        return "TCP://{0}:{1}".format(self._host, self._port)
+
+    def open(self):
+        self._socket = socket.create_connection(
+            [self._host, self._port], timeout=self.connect_timeout
+        )
+        self._socket.setblocking(False)
+        self._open_poll(self._socket.fileno())
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._close_poll()
+
+    def read_into(self, view, timeout):
+        if self._socket is None:
+            raise ConnectionError("Not connected")
+        if not self._wait(timeout):
+            return 0
+
+        # Coalesce, one recv takes everything the kernel already has. A read
+        # that does not fill view has drained the socket, one that does is
+        # picked up by the next poll, so there is no recv just to see EAGAIN
+        try:
+            count = self._socket.recv_into(view)
+        except BlockingIOError:
+            return 0
+        if not count:
+            raise ConnectionError("Connection closed by {}".format(self))
+        return count
+
+    def write(self, data):
+        if self._socket is None:
+            raise ConnectionError("Not connected")
+        # The socket is non-blocking for the reader, wait for room if needed
+        deadline = time.monotonic() + self.write_timeout
+        remaining = memoryview(data)
+        while remaining:
+            try:
+                sent = self._socket.send(remaining)
+            except BlockingIOError:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    raise TimeoutError("Write to {} timed out".format(self))
+                select.select([], [self._socket], [], min(wait, 1))
+                continue
+            remaining = remaining[sent:]
+
+    def test(self, timeout):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect((self._host, self._port))
+        return True
+
+
+class SerialTransport(PertronicTransport):
+    """Local RS485 adapter via pyserial"""
+
+    # Collect this many seconds of bus traffic per read
+    read_interval = 0.05
+
+    def __init__(self, port: str, baudrate: int):
+        if serial is None:
+            raise ImportError("pyserial is required for serial connections")
+        self._port = port
+        self._baudrate = baudrate
+        self._serial = None
+        self._interrupted = False
+
+        # 10 bits per byte on the wire (start + 8 data + stop)
+        self.read_size = max(64, int(baudrate / 10 * self.read_interval))
+
+    def __str__(self):
+        return "{0}@{1}".format(self._port, self._baudrate)
+
+    def open(self):
+        self._serial = serial.Serial(
+            self._port,
+            self._baudrate,
+            timeout=self.read_interval,
+            write_timeout=self.write_timeout,
+        )
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def interrupt(self):
+        self._interrupted = True
+        if self._serial is not None and hasattr(self._serial, "cancel_read"):
+            self._serial.cancel_read()
+
+    def read_into(self, view, timeout):
+        if self._serial is None:
+            raise ConnectionError("Not connected")
+        # Bulk read, returns after read_size bytes or once the bus has been
+        # quiet for read_interval, whichever comes first
+        reads = max(1, int(timeout / self.read_interval))
+        for _ in range(reads):
+            if self._interrupted:
+                self._interrupted = False
+                return 0
+            try:
+                size = min(len(view), max(self.read_size, self._serial.in_waiting))
+                data = self._serial.read(size)
+            except serial.SerialException as e:
+                raise ConnectionError(str(e)) from e
+            if data:
+                view[: len(data)] = data
+                return len(data)
+        raise TimeoutError("No data from {}".format(self))
+
+    def write(self, data):
+        if self._serial is None:
+            raise ConnectionError("Not connected")
+        self._serial.write(data)
+
+
+class FileTransport(_PollingTransport):
+    """A capture file, FIFO or pty, used for replays and tests"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._path = path
+        self._fd = None
+
+    def __str__(self):
+        return "file://{}".format(self._path)
+
+    def open(self):
+        if stat.S_ISCHR(os.stat(self._path).st_mode):
+            # A pty can be written back to, needed for active mode
+            self._fd = os.open(self._path, os.O_RDWR | os.O_NOCTTY)
+        else:
+            # Never write into a capture, and see EOF when a FIFO writer exits
+            self._fd = os.open(self._path, os.O_RDONLY)
+        self._open_poll(self._fd)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._close_poll()
+
+    def test(self, timeout):
+        # Opening a FIFO blocks until the writer appears, only check it exists
+        os.stat(self._path)
+        return True
+
+    def read_into(self, view, timeout):
+        if self._fd is None:
+            raise ConnectionError("Not connected")
+        if not self._wait(timeout):
+            return 0
+        count = os.readv(self._fd, [view])
+        if not count:
+            raise EOFError("End of {}".format(self))
+        return count
+
+    def write(self, data):
+        if self._fd is None:
+            raise ConnectionError("Not connected")
+        os.write(self._fd, data)
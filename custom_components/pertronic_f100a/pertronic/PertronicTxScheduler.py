@@ -0,0 +1,105 @@
+"""Timed transmit scheduler for answering the panel on the RS485 bus.
+
+RS485 is half duplex, a reply has to wait until the panel has released the bus
+(the turnaround time) but also has to go out before the panel moves on to the
+next device. Frames are queued with a due time and are dropped rather than sent
+late.
+"""
+
+import heapq
+import logging
+from threading import Condition, Thread
+import time
+
+
+def _monotonic_milli_time():
+    return time.monotonic_ns() // 1000000
+
+
+class PertronicTxScheduler:
+    def __init__(self, write, last_rx_ms, turnaround_ms: int, max_late_ms: int):
+        """
+        write:        function(bytes) that puts a frame on the bus
+        last_rx_ms:   function() returning the monotonic ms of the last received byte
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+
+        self._write = write
+        self._last_rx_ms = last_rx_ms
+        self._turnaround_ms = turnaround_ms
+        self._max_late_ms = max_late_ms
+
+        self._queue = []
+        self._seq = 0
+        self._condition = Condition()
+        self._run = False
+        self._thread = None
+
+        self.stats = {"tx_frames": 0, "tx_dropped_late": 0, "tx_errors": 0}
+
+    def start(self):
+        self._run = True
+        self._thread = Thread(
+            target=self._tx_loop, args=(), name="pertronic_tx", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop transmitting, waits up to timeout seconds for a write in
+        progress and returns False if it is still running after that"""
+        with self._condition:
+            self._run = False
+            self._queue = []
+            self._condition.notify()
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return False
+        self._thread = None
+        return True
+
+    def schedule(self, frame: bytes, rx_time_ms=None):
+        """Queue frame as a reply to a frame received at rx_time_ms"""
+        if rx_time_ms is None:
+            rx_time_ms = _monotonic_milli_time()
+        with self._condition:
+            self._seq += 1
+            heapq.heappush(
+                self._queue, (rx_time_ms + self._turnaround_ms, self._seq, frame)
+            )
+            self._condition.notify()
+
+    def _tx_loop(self):
+        while True:
+            with self._condition:
+                while self._run and not self._queue:
+                    self._condition.wait()
+                if not self._run:
+                    return
+
+                reply_due_ms, _, frame = self._queue[0]
+                # Never transmit until the bus has been quiet for the turnaround
+                due_ms = reply_due_ms
+                last_rx_ms = self._last_rx_ms()
+                if last_rx_ms is not None:
+                    due_ms = max(due_ms, last_rx_ms + self._turnaround_ms)
+
+                now_ms = _monotonic_milli_time()
+                if now_ms < due_ms:
+                    self._condition.wait((due_ms - now_ms) / 1000)
+                    continue
+
+                heapq.heappop(self._queue)
+
+            # A late reply would collide with the panel talking to the next device
+            if now_ms - reply_due_ms > self._max_late_ms:
+                self.stats["tx_dropped_late"] += 1
+                continue
+
+            try:
+                self._write(frame)
+                self.stats["tx_frames"] += 1
+            except Exception as e:
+                self.stats["tx_errors"] += 1
+                self.log.error("Unable to transmit frame - {}".format(e))
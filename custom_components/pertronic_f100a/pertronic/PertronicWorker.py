@@ -0,0 +1,265 @@
+"""Run socket reading and frame decoding in a separate process.
+
+The worker process owns the connection to the RS485 interface and decodes
+every frame. Only compact state diffs are sent back over a pipe, one message
+per read from the interface:
+
+    ("h", rx_time_ms)                           heartbeat
+    ("l", rx_time_ms, status, led_xor)          LED mimic, led_xor is the XOR
+                                                against the previous bitmap
+    ("c", rx_time_ms, line, text, led_bytes)    LCD line, text is None when
+                                                unchanged
+    ("s", rx_time_ms, stats)                    receive and bus error stats,
+                                                at most once a second
+
+The parent applies the diffs to its own state and runs the callbacks, so the
+rest of the integration uses PertronicF100AMimicProcess exactly like
+PertronicF100AMimic.
+"""
+
+import multiprocessing
+from threading import Thread
+
+from .PertronicF100AMimic import PertronicF100AMimic, current_monotonic_milli_time
+from .PertronicFrames import HeartbeatFrame, LcdLineFrame, LedMimicFrame
+
+# Stats only the worker can count, reading and validation happen there
+WORKER_STATS = (
+    "reads",
+    "bytes_received",
+    "rx_buffer_size",
+    "bytes_skipped",
+    "decode_errors",
+    "frames_checked",
+    "frames_rejected",
+    "bus_error_ratio",
+    "checksum_led",
+    "checksum_lcd",
+    "mimic_response",
+    "polls_answered",
+    "polls_yielded",
+    "polls_unanswered",
+    "tx_frames",
+    "tx_dropped_late",
+    "tx_errors",
+)
+
+
+class _WorkerMimic(PertronicF100AMimic):
+    """Decoder used inside the worker process, collects diffs instead of
+    running callbacks"""
+
+    def __init__(
+        self, transport, conn, active_mode, turnaround_ms, verify_frames, mimic_response
+    ):
+        super().__init__(
+            None,
+            None,
+            active_mode=active_mode,
+            turnaround_ms=turnaround_ms,
+            transport=transport,
+            verify_frames=verify_frames,
+            mimic_response=mimic_response,
+        )
+        self._conn = conn
+        self._diffs = []
+        self._sent_led_bitmap = bytes(LedMimicFrame.LED_BYTES)
+        self._sent_lcd_text = {1: None, 2: None}
+        self._sent_stats_ms = 0
+
+    def process_heartbeat(self, frame):
+        self._diffs.append(("h", frame.rx_time_ms))
+
+    def _process_led_frame(self, frame, rx_time_ms):
+        led_bytes = frame.led_bytes
+        previous = self._sent_led_bitmap
+        if previous == led_bytes:
+            led_xor = None
+        else:
+            led_xor = bytes(a ^ b for a, b in zip(led_bytes, previous))
+            self._sent_led_bitmap = bytes(led_bytes)
+        self._diffs.append(("l", rx_time_ms, frame.status, led_xor))
+
+    def _process_lcd_frame(self, frame, rx_time_ms):
+        line = frame.line
+        text = None
+        if self._sent_lcd_text[line] != frame.text_bytes:
+            text = bytes(frame.text_bytes)
+            self._sent_lcd_text[line] = text
+        self._diffs.append(("c", rx_time_ms, line, text, bytes(frame.led_bytes)))
+
+    def _end_of_read(self):
+        now_ms = current_monotonic_milli_time()
+        if now_ms - self._sent_stats_ms >= 1000:
+            self._sent_stats_ms = now_ms
+            stats = self.get_stats()
+            self._diffs.append(
+                ("s", now_ms, {key: stats[key] for key in WORKER_STATS if key in stats})
+            )
+        if not self._diffs:
+            return
+        self._conn.send(self._diffs)
+        self._diffs = []
+
+
+def _worker_main(
+    transport, conn, active_mode, turnaround_ms, verify_frames, mimic_response
+):
+    """Entry point of the worker process"""
+    mimic = _WorkerMimic(
+        transport, conn, active_mode, turnaround_ms, verify_frames, mimic_response
+    )
+    mimic._run = True
+    if active_mode:
+        # Polls are answered from the worker, it owns the connection
+        mimic._start_tx_scheduler()
+    try:
+        mimic._io_loop()
+    except (BrokenPipeError, EOFError, KeyboardInterrupt):
+        pass
+
+
+class PertronicF100AMimicProcess(PertronicF100AMimic):
+    """PertronicF100AMimic with decoding offloaded to a worker process"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        liveness_timeout: int = 30,
+        active_mode: bool = False,
+        turnaround_ms: int = 5,
+        transport=None,
+        verify_frames: bool = True,
+        mimic_response: bytes = None,
+    ):
+        super().__init__(
+            host,
+            port,
+            liveness_timeout,
+            active_mode,
+            turnaround_ms,
+            transport,
+            verify_frames,
+            mimic_response,
+        )
+        self._process = None
+        self._conn = None
+        self._worker_led_bitmap = bytearray(LedMimicFrame.LED_BYTES)
+        self._worker_lcd_text = {
+            1: b" " * LcdLineFrame.TEXT_LENGTH,
+            2: b" " * LcdLineFrame.TEXT_LENGTH,
+        }
+        self._worker_stats = {}
+
+    def start(self):
+        if not self.test_connection():
+            return False
+
+        # spawn rather than fork, HA runs many threads
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_worker_main,
+            args=(
+                self._transport,
+                child_conn,
+                self._active_mode,
+                self._turnaround_ms,
+                self._verify_frames,
+                self._mimic_response,
+            ),
+            name="pertronic_f100a_worker",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+
+        self._run = True
+        self._run_thread = Thread(
+            target=self._diff_loop, args=(), name="pertronic_diff", daemon=True
+        )
+        self._run_thread.start()
+        self.log.info("Started decoder worker process {}".format(self._process.pid))
+        return True
+
+    def stop(self, timeout=None):
+        self._run = False
+        self._close_subscriptions()
+        stopped = True
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self.log.warning("Decoder worker did not exit, killing it")
+                self._process.kill()
+                self._process.join(timeout)
+            self._process = None
+        if self._run_thread is not None:
+            self._run_thread.join(timeout)
+            stopped = not self._run_thread.is_alive()
+            self._run_thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        return stopped
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update(self._worker_stats)
+        return stats
+
+    def _diff_loop(self):
+        conn = self._conn
+        while self._run:
+            try:
+                if not conn.poll(1):
+                    continue
+                diffs = conn.recv()
+            except (EOFError, OSError):
+                if self._run:
+                    self.log.error("Decoder worker process exited")
+                return
+
+            for diff in diffs:
+                try:
+                    self._apply_diff(diff)
+                except Exception as e:
+                    self.log.error(
+                        "Unable to apply worker diff {} - {}".format(diff, e)
+                    )
+
+    def _apply_diff(self, diff):
+        kind = diff[0]
+        rx_time_ms = diff[1]
+
+        if kind == "h":
+            self.process_heartbeat(
+                HeartbeatFrame(bytes(HeartbeatFrame.HEADER), rx_time_ms)
+            )
+
+        elif kind == "l":
+            status, led_xor = diff[2], diff[3]
+            bitmap = self._worker_led_bitmap
+            if led_xor is not None:
+                for i, changed in enumerate(led_xor):
+                    bitmap[i] ^= changed
+            pkt = (
+                bytes(LedMimicFrame.HEADER) + bytes([status, 0]) + bitmap + b"\x00\x00"
+            )
+            self._process_led_frame(LedMimicFrame(pkt, rx_time_ms), rx_time_ms)
+
+        elif kind == "c":
+            line, text, led_bytes = diff[2], diff[3], diff[4]
+            if text is not None:
+                self._worker_lcd_text[line] = text
+            pkt = (
+                bytes([LcdLineFrame.HEADER, LcdLineFrame.LINE_1 + line - 1])
+                + self._worker_lcd_text[line]
+                + led_bytes
+            )
+            self._process_lcd_frame(LcdLineFrame(pkt, rx_time_ms), rx_time_ms)
+
+        elif kind == "s":
+            self._worker_stats = diff[2]
+            self.stats["bus_error_ratio"] = diff[2].get("bus_error_ratio", 0.0)
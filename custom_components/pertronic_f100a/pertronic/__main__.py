@@ -0,0 +1,161 @@
+"""Headless monitor for a Pertronic F100A panel, without Home Assistant.
+
+Run from the integration directory so Home Assistant is not imported:
+
+    cd custom_components/pertronic_f100a
+    python -m pertronic --host 192.168.1.1 --port 20108
+    python -m pertronic --serial /dev/ttyUSB0 --baudrate 9600
+    python -m pertronic --replay capture.bin
+
+Decoded state changes are written to stdout as JSON lines. --http and --unix
+serve the current state, statistics and liveness as JSON.
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import socketserver
+import sys
+from threading import Thread
+import time
+
+from .PertronicExport import PertronicStateExporter, StreamSink, create_sink
+from .PertronicF100AMimic import PertronicF100AMimic
+from .PertronicTransport import FileTransport, SerialTransport, TcpTransport
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m pertronic", description=__doc__.splitlines()[0]
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--host", help="RS485 to Ethernet interface address")
+    source.add_argument("--serial", help="Local RS485 adapter, e.g. /dev/ttyUSB0")
+    source.add_argument("--replay", help="Capture file, FIFO or pty to decode")
+    parser.add_argument("--port", type=int, default=20108)
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--name", default="F100A", help="Panel name in the output")
+    parser.add_argument(
+        "--stale-timeout",
+        type=int,
+        default=30,
+        help="Seconds without frames before the panel is reported unavailable",
+    )
+    parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="Accept frames that fail their learnt check bytes",
+    )
+    parser.add_argument("--http", metavar="HOST:PORT", help="Serve status over HTTP")
+    parser.add_argument("--unix", metavar="PATH", help="Serve status on a Unix socket")
+    parser.add_argument(
+        "--export",
+        action="append",
+        default=[],
+        metavar="URL",
+        help="Also publish diffs to a sink URL, may be repeated",
+    )
+    parser.add_argument("--no-stdout", action="store_true", help="No JSON lines")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Warnings only")
+    return parser.parse_args(argv)
+
+
+def _status_handler(mimic):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(
+                {
+                    "available": mimic.available,
+                    "state": mimic.decoded_data,
+                    "stats": mimic.get_stats(),
+                    "frame_timing": mimic.frame_timing,
+                    "flapping_leds": mimic.get_flapping_leds(),
+                }
+            ).encode("utf8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatusHandler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _serve(server):
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    if args.host:
+        transport = TcpTransport(args.host, args.port)
+    elif args.serial:
+        transport = SerialTransport(args.serial, args.baudrate)
+    else:
+        transport = FileTransport(args.replay)
+
+    mimic = PertronicF100AMimic(
+        args.host,
+        args.port,
+        args.stale_timeout,
+        transport=transport,
+        verify_frames=not args.no_verify,
+    )
+    if args.quiet:
+        mimic.log.setLevel(logging.WARNING)
+
+    sinks = [create_sink(url) for url in args.export]
+    if not args.no_stdout:
+        sinks.append(StreamSink(sys.stdout))
+    exporter = None
+    if sinks:
+        exporter = PertronicStateExporter(mimic, sinks, args.name, batch_interval=0.05)
+        exporter.start()
+
+    servers = []
+    if args.http:
+        host, _, port = args.http.rpartition(":")
+        servers.append(
+            _serve(ThreadingHTTPServer((host, int(port)), _status_handler(mimic)))
+        )
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.unlink(args.unix)
+        servers.append(_serve(_UnixHTTPServer(args.unix, _status_handler(mimic))))
+
+    exit_code = 0
+    if not mimic.start():
+        exit_code = 1
+    else:
+        try:
+            while mimic._run:
+                time.sleep(1)
+                mimic.check_liveness()
+        except KeyboardInterrupt:
+            pass
+        mimic.stop()
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    if args.unix and os.path.exists(args.unix):
+        os.unlink(args.unix)
+    if exporter is not None:
+        exporter.stop()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
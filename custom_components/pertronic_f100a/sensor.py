@@ -0,0 +1,175 @@
+"""Liveness, bus and LED activity statistics sensors."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import CONF_API_REF, DOMAIN
+from .pertronic.PertronicF100AMimic import PertronicF100AMimic
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+):
+    """Set up entry."""
+    _LOGGER.info("Loading f100a liveness sensors")
+    sensors: list[PertronicLivenessSensor] = []
+    pertronic: PertronicF100AMimic = hass.data[DOMAIN][entry.entry_id][CONF_API_REF]
+
+    sensors.append(PertronicHeartbeatRateSensor(pertronic, entry))
+    sensors.append(PertronicHeartbeatJitterSensor(pertronic, entry))
+    sensors.append(PertronicBusErrorSensor(pertronic, entry))
+    sensors.append(PertronicLedTransitionsSensor(pertronic, entry))
+    sensors.append(PertronicFlappingLedsSensor(pertronic, entry))
+
+    async_add_entities(sensors)
+
+
+class PertronicLivenessSensor(SensorEntity):
+    """Base for sensors updated by the liveness monitor rather than polled"""
+
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, key, name, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        self._pertronic = pertronic
+
+        self._attr_name = "{} {}".format("F100A", name)
+        self._attr_unique_id = "{}_{}_{}".format("F100A", entry.entry_id, key)
+        self._attr_native_value = None
+
+        pertronic.register_liveness_callback(self.proccess_callback)
+
+    def read_value(self):
+        """Returns the current value from the mimic"""
+        raise NotImplementedError
+
+    def proccess_callback(self, frame_timing):
+        """Callback processor, only writes state when the value changes"""
+        value = self.read_value()
+        if value is not None:
+            value = round(value, 1)
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop receiving updates once removed, e.g. when the entry unloads"""
+        self._pertronic.unregister_callback(self.proccess_callback)
+
+
+class PertronicHeartbeatRateSensor(PertronicLivenessSensor):
+    """Panel heartbeats per minute"""
+
+    _attr_icon = "mdi:heart-pulse"
+    _attr_native_unit_of_measurement = "heartbeats/min"
+
+    def __init__(self, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        super().__init__("heartbeat_rate", "Heartbeat Rate", pertronic, entry)
+
+    def read_value(self):
+        return self._pertronic.get_heartbeat_rate()
+
+
+class PertronicHeartbeatJitterSensor(PertronicLivenessSensor):
+    """Smoothed jitter of the heartbeat inter-arrival time"""
+
+    _attr_icon = "mdi:pulse"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+    def __init__(self, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        super().__init__("heartbeat_jitter", "Heartbeat Jitter", pertronic, entry)
+
+    def read_value(self):
+        return self._pertronic.get_heartbeat_jitter()
+
+    @property
+    def extra_state_attributes(self):
+        """Inter-arrival times for each frame type"""
+        attributes = {}
+        for frame_type, timing in self._pertronic.frame_timing.items():
+            attributes["{}_count".format(frame_type)] = timing["count"]
+            attributes["{}_interval_ms".format(frame_type)] = timing["interval_ms"]
+        return attributes
+
+
+class PertronicBusErrorSensor(PertronicLivenessSensor):
+    """Share of recent LED / LCD frames rejected as corrupt"""
+
+    _attr_icon = "mdi:transit-connection-variant"
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    def __init__(self, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        super().__init__("bus_errors", "Bus Errors", pertronic, entry)
+
+    def read_value(self):
+        return self._pertronic.get_bus_error_rate()
+
+    @property
+    def extra_state_attributes(self):
+        """Error counters and the check bytes learnt for each frame type"""
+        stats = self._pertronic.get_stats()
+        return {
+            key: stats.get(key)
+            for key in (
+                "frames_checked",
+                "frames_rejected",
+                "bytes_skipped",
+                "checksum_led",
+                "checksum_lcd",
+            )
+        }
+
+
+class PertronicLedTransitionsSensor(PertronicLivenessSensor):
+    """Addressable LED transitions within the activity window"""
+
+    _attr_icon = "mdi:swap-horizontal"
+    _attr_native_unit_of_measurement = "transitions"
+
+    def __init__(self, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        super().__init__("led_transitions", "LED Transitions", pertronic, entry)
+
+    def read_value(self):
+        return self._pertronic.get_led_transitions()
+
+    @property
+    def extra_state_attributes(self):
+        """Activity window and how many updates have been held back"""
+        stats = self._pertronic.activity.stats
+        return {
+            "window_s": self._pertronic.activity.window_ms // 1000,
+            "updates_suppressed": stats["led_updates_suppressed"],
+        }
+
+
+class PertronicFlappingLedsSensor(PertronicLivenessSensor):
+    """Number of addressable LEDs flagged as flapping"""
+
+    _attr_icon = "mdi:alert-decagram"
+    _attr_native_unit_of_measurement = "LEDs"
+
+    def __init__(self, pertronic: PertronicF100AMimic, entry: ConfigEntry):
+        super().__init__("flapping_leds", "Flapping LEDs", pertronic, entry)
+
+    def read_value(self):
+        return len(self._pertronic.get_flapping_leds())
+
+    @property
+    def extra_state_attributes(self):
+        """Activity of each flapping LED"""
+        return {
+            "leds": {
+                led_id: self._pertronic.get_led_activity(led_id)
+                for led_id in self._pertronic.get_flapping_leds()
+            }
+        }
@@ -52,6 +52,7 @@ class PertronicLCDText(TextEntity):
         self._pattern = None
         self._native_value = "NO_DATA"
         pertronic.register_lcd_callback(self.proccess_callback)
+        pertronic.register_availability_callback(self.availability_callback)
 
     def set_value(self, value: str) -> None:
         """Set the text value."""
@@ -65,6 +66,15 @@ class PertronicLCDText(TextEntity):
     def native_value(self):
         return self._native_value
 
+    @property
+    def available(self):
+        """Unavailable while the panel has gone quiet"""
+        return self._pertronic.available
+
+    def availability_callback(self, available):
+        """Availability change from the liveness monitor"""
+        self.async_write_ha_state()
+
     def proccess_callback(self, text_0, text_1):
         if self._lcd_line == 1:
             self._native_value = text_0
@@ -76,3 +86,8 @@ class PertronicLCDText(TextEntity):
         self.proccess_callback(
             self._pertronic.get_lcd_text(1), self._pertronic.get_lcd_text(2)
         )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop receiving updates once removed, e.g. when the entry unloads"""
+        self._pertronic.unregister_callback(self.proccess_callback)
+        self._pertronic.unregister_callback(self.availability_callback)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# The decoder is imported as the top level pertronic package, as it is when
+# run headless from custom_components/pertronic_f100a
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "custom_components",
+        "pertronic_f100a",
+    ),
+)
@@ -0,0 +1,155 @@
+"""Feed random, truncated, concatenated and split frames through decode_bytes"""
+
+import logging
+import random
+import time
+
+import pytest
+
+from pertronic.PertronicF100AMimic import PertronicF100AMimic
+
+# First bytes of every known frame header, garbage made of other bytes can
+# never start or complete a frame
+HEADER_BYTES = frozenset({0x19, 0x20, 0x80, 0x11, 0xA0, 0x40, 0x1C, 0x47, 0x83})
+GARBAGE_BYTES = bytes(b for b in range(256) if b not in HEADER_BYTES)
+
+
+class CountingMimic(PertronicF100AMimic):
+    """Counts the frames and bytes the framer hands to each decoder"""
+
+    def __init__(self):
+        super().__init__(None, None)
+        self.log.setLevel(logging.CRITICAL)
+        self.frames = {}
+        self.frame_bytes = 0
+        for header, (length, third_byte, handler) in self._frame_decoders.items():
+            self._frame_decoders[header] = (
+                length,
+                third_byte,
+                self._counting(header, handler),
+            )
+
+    def _counting(self, header, handler):
+        def count(view):
+            self.frames[header] = self.frames.get(header, 0) + 1
+            self.frame_bytes += len(view)
+            if handler is not None:
+                handler(view)
+
+        return count
+
+
+def led_frame(rng):
+    return bytes((0x19, 0x24)) + rng.randbytes(36)
+
+
+def lcd_frame(rng):
+    text = "ZONE {:03d} {}".format(rng.randrange(256), rng.choice(("FIRE", "FAULT")))
+    return (
+        bytes((0x20, rng.choice((0x17, 0x18))))
+        + text.ljust(40).encode("ascii")
+        + rng.randbytes(4)
+    )
+
+
+FRAME_BUILDERS = (
+    ((0x19, 0x24), led_frame),
+    ((0x20, 0x17), None),
+    ((0x80, 0x22), lambda rng: bytes((0x80, 0x22))),
+    ((0x80, 0x90), lambda rng: bytes((0x80, 0x90)) + rng.randbytes(8)),
+    ((0xA0, 0x88), lambda rng: bytes((0xA0, 0x88)) + rng.randbytes(12)),
+    ((0x47, 0x31), lambda rng: bytes((0x47, 0x31, 0x97))),
+)
+
+
+def random_frame(rng):
+    header, builder = rng.choice(FRAME_BUILDERS)
+    if builder is None:
+        frame = lcd_frame(rng)
+        header = (frame[0], frame[1])
+    else:
+        frame = builder(rng)
+    return header, frame
+
+
+def feed(mimic, rng, stream, max_chunk=64):
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, max_chunk)
+        mimic.decode_bytes(stream[pos : pos + size])
+        pos += size
+
+
+def assert_all_bytes_accounted(mimic, fed):
+    # Every byte fed is either part of a frame, skipped, or still waiting for
+    # the rest of a frame, so no byte is looked at more than a bounded number
+    # of times
+    assert mimic.frame_bytes + mimic.stats["bytes_skipped"] + mimic._rx_fill == fed
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_bytes(seed):
+    rng = random.Random(seed)
+    mimic = CountingMimic()
+    stream = rng.randbytes(200000)
+
+    feed(mimic, rng, stream)
+
+    assert mimic.stats["decode_errors"] == 0
+    assert_all_bytes_accounted(mimic, len(stream))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_truncated_and_concatenated_frames(seed):
+    rng = random.Random(seed)
+    mimic = CountingMimic()
+    parts = []
+    for _ in range(3000):
+        _, frame = random_frame(rng)
+        if rng.random() < 0.3:
+            frame = frame[: rng.randrange(len(frame))]
+        parts.append(frame)
+    stream = b"".join(parts)
+
+    feed(mimic, rng, stream)
+
+    assert mimic.stats["decode_errors"] == 0
+    assert_all_bytes_accounted(mimic, len(stream))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_chunk", (1, 7, 64, 4096))
+def test_no_frames_lost_to_garbage_or_split_reads(seed, max_chunk):
+    rng = random.Random(seed)
+    mimic = CountingMimic()
+    expected = {}
+    parts = []
+    for _ in range(2000):
+        if rng.random() < 0.5:
+            parts.append(
+                bytes(rng.choice(GARBAGE_BYTES) for _ in range(rng.randint(1, 20)))
+            )
+        header, frame = random_frame(rng)
+        expected[header] = expected.get(header, 0) + 1
+        parts.append(frame)
+    stream = b"".join(parts)
+
+    feed(mimic, rng, stream, max_chunk)
+
+    assert mimic.frames == expected
+    assert mimic.stats["decode_errors"] == 0
+    assert mimic._rx_fill == 0
+    assert_all_bytes_accounted(mimic, len(stream))
+
+
+def test_garbage_decode_time_budget():
+    rng = random.Random(0)
+    mimic = CountingMimic()
+    stream = rng.randbytes(1 << 20)
+
+    start = time.perf_counter()
+    feed(mimic, rng, stream, 500)
+    elapsed = time.perf_counter() - start
+
+    # 1MB is over 90s of traffic on a 115200 baud bus
+    assert elapsed < 5, "{:.1f}s to decode 1MB".format(elapsed)
@@ -0,0 +1,156 @@
+"""Start and stop the reader repeatedly, as reloading the entry does, and check
+that threads, file descriptors, log handlers and memory stay flat"""
+
+import gc
+import io
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from pertronic.PertronicExport import PertronicStateExporter, StreamSink
+from pertronic.PertronicF100AMimic import PertronicF100AMimic
+from pertronic.PertronicFrames import mimic_response_from_hex
+from pertronic.PertronicWorker import PertronicF100AMimicProcess
+
+POLL = bytes((0x80, 0x90)) + bytes(8)
+RESPONSE = mimic_response_from_hex("40 40 00 01 00 00 00 00 00 00")
+
+
+@pytest.fixture
+def panel():
+    """TCP server sending a heartbeat and an LCD mimic poll every 10ms to every
+    connection until the reader closes it"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(50)
+    server.settimeout(0.1)
+    stop = threading.Event()
+
+    def send(conn):
+        try:
+            while not stop.wait(0.01):
+                readable, _, _ = select.select([conn], [], [], 0)
+                if readable and not conn.recv(64):
+                    break
+                conn.sendall(b"\x80\x22" + POLL)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def accept():
+        while not stop.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(
+                target=send, args=(conn,), name="panel_send", daemon=True
+            ).start()
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    server.close()
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def settle():
+    """Wait for the server side of closed connections to go away"""
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and any(
+        thread.name == "panel_send" for thread in threading.enumerate()
+    ):
+        time.sleep(0.01)
+
+
+def reload_once(mimic_class, port, **kwargs):
+    mimic = mimic_class("127.0.0.1", port, **kwargs)
+    mimic.log.setLevel(logging.CRITICAL)
+    exporter = PertronicStateExporter(mimic, [StreamSink(io.StringIO())])
+    exporter.log.setLevel(logging.CRITICAL)
+
+    def alarm(led_type, state, decode_latency_ms):
+        pass
+
+    mimic.register_alarm_callback(alarm)
+    exporter.start()
+    assert mimic.start()
+    time.sleep(0.02)
+    # The order stop_api uses
+    assert mimic.stop(5)
+    exporter.stop(5)
+    mimic.unregister_callback(alarm)
+    return mimic.stats
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"active_mode": True, "mimic_response": RESPONSE}],
+    ids=["passive", "active"],
+)
+def test_reload_does_not_leak(panel, kwargs):
+    logger = logging.getLogger(PertronicF100AMimic.__name__)
+    reload_once(PertronicF100AMimic, panel, **kwargs)
+    gc.collect()
+    settle()
+
+    threads = threading.active_count()
+    fds = open_fds()
+    handlers = len(logger.handlers)
+    tracemalloc.start()
+    try:
+        for _ in range(20):
+            reload_once(PertronicF100AMimic, panel, **kwargs)
+        gc.collect()
+        warm, _ = tracemalloc.get_traced_memory()
+
+        answered = 0
+        for _ in range(200):
+            stats = reload_once(PertronicF100AMimic, panel, **kwargs)
+            answered += stats["polls_answered"]
+        gc.collect()
+        settle()
+        grown, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert threading.active_count() == threads
+    assert open_fds() == fds
+    assert len(logger.handlers) == handlers
+    if kwargs:
+        # The transmit thread answered polls, not just started and stopped
+        assert answered > 0
+    # Allow for caches settling, a leaked reader holds far more than this
+    assert grown - warm < 64 * 1024
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_worker_reload_does_not_leak(panel):
+    reload_once(PertronicF100AMimicProcess, panel)
+    gc.collect()
+    settle()
+
+    threads = threading.active_count()
+    fds = open_fds()
+    for _ in range(3):
+        reload_once(PertronicF100AMimicProcess, panel)
+    gc.collect()
+    settle()
+
+    assert threading.active_count() == threads
+    assert open_fds() == fds